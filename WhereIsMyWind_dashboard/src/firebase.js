@@ -1,6 +1,6 @@
 // src/firebase.js
 import { initializeApp } from 'firebase/app';
-import { getFirestore, collection, getDocs } from 'firebase/firestore';
+import { getFirestore, collection, getDocs, doc, getDoc } from 'firebase/firestore';
 
 // Your Firebase configuration
 const firebaseConfig = {
@@ -256,4 +256,27 @@ export async function loadSailingPerformancePoints() {
   }
 }
 
+/**
+ * Load the pre-aggregated performance summary of one date
+ * (wind rose, polar bin statistics and track bounds, per date and per tour)
+ * @param {string} date - Date as YYYY-MM-DD
+ * @returns {Promise<Object|null>} Summary object, or null if there is none
+ */
+export async function loadPerformanceSummary(date) {
+  try {
+    const summaryRef = doc(db, 'sailing_performance_summaries', date);
+    const snapshot = await getDoc(summaryRef);
+
+    if (!snapshot.exists()) {
+      console.warn(`⚠️ No performance summary for ${date}`);
+      return null;
+    }
+
+    return snapshot.data();
+  } catch (error) {
+    console.error('❌ Error loading performance summary:', error);
+    throw error;
+  }
+}
+
 export { db };
\ No newline at end of file
@@ -1,7 +1,20 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
+import numpy as np  # type: ignore
 import pandas as pd
 import os
 import json
+import functools
+import zlib
+import utils_spatial as utsp
+import utils_marks as utm
+import utils_serving as utsv
+import utils_transport as uttr
+import utils_store as utst
+import utils_summary as uts
+import utils_sampling as utsm
+import utils_bins as utb
+import utils_compare as utcmp
+import utils_tiles as uttl
 
 app = Flask(__name__)
 
@@ -9,10 +22,89 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 TRACK_FILE = os.path.join(BASE_DIR, "data/outputs/all_sailing_performance_clean.csv")
 MARKS_FILE = os.path.join(BASE_DIR, "marks.json")
-
-df = pd.read_csv(TRACK_FILE)
-
-tours = sorted(df["gpx_path"].unique())
+STORE_DIR = os.path.join(BASE_DIR, "data/outputs/point_store")
+TILE_DIR = os.path.join(BASE_DIR, "data/outputs/heatmap_tiles")
+TOUR_INDEX = os.path.join(BASE_DIR, uts.TOUR_INDEX)
+
+# the memory-mapped store is shared between workers; the CSV is the fallback
+store = utst.PointStore(STORE_DIR) \
+    if os.path.exists(os.path.join(STORE_DIR, "meta.json")) else None
+if store is not None:
+    df = store.frame()
+else:
+    df = pd.read_csv(TRACK_FILE)
+    df["time"] = pd.to_datetime(df["time"], format="mixed", utc=True)
+
+# row positions of every tour and a contiguous lat/lon array, so a track
+# request is a gather instead of a scan over the whole DataFrame
+tour_rows = df.groupby("gpx_path", observed=True).indices
+
+# per-tour statistics, precomputed by get_perforance.py (built here from
+# the loaded points when the index is missing or behind: a tour it lacks,
+# or with the store, a row whose hash is not the tour's store hash)
+tour_index = uts.load_tour_index(TOUR_INDEX)
+hashes = {t["tour"]: t["hash"] for t in store.tours} \
+    if store is not None else {}
+if hashes:
+    row_hashes = tour_index["hash"] if "hash" in tour_index \
+        else [None] * len(tour_index)
+    tour_index = tour_index[[hashes.get(t) == h for t, h in
+                             zip(tour_index["tour"], row_hashes)]]
+indexed = set(tour_index["tour"])
+missing = [t for t in tour_rows if t not in indexed]
+if missing:
+    date_col = df["date"].astype(str).values
+    extra = pd.DataFrame([uts.tour_row(t, date_col[tour_rows[t][0]],
+                                       {c: df[c].values[tour_rows[t]]
+                                        for c in ("lat", "lon", "time",
+                                                  "boat_speed", "wind_speed",
+                                                  "speed_ratio")},
+                                       hashes.get(t))
+                          for t in missing], columns=uts.TOUR_INDEX_COLUMNS)
+    tour_index = pd.concat([tour_index, extra], ignore_index=True) \
+        if len(tour_index) else extra
+tour_index = tour_index[tour_index["tour"].isin(tour_rows)] \
+    .reset_index(drop=True)
+
+tours = sorted(tour_index["tour"].tolist())
+latlon = df[["lat", "lon"]].to_numpy()
+
+# compact encodings of every track, built once (see utils_transport)
+track_polyline = {t: uttr.encode_polyline(latlon[r, 0], latlon[r, 1])
+                  for t, r in tour_rows.items()}
+track_binary = {t: uttr.encode_binary(latlon[r, 0], latlon[r, 1],
+                                      df["time"].values[r],
+                                      df["boat_speed"].values[r])
+                for t, r in tour_rows.items()}
+
+grid = utsp.GridIndex(df["lat"].values, df["lon"].values)
+
+# per-tour time index: row positions sorted by time and their times (ns),
+# so a time window is two searchsorted calls plus a gather
+times_ns = df["time"].values.astype("datetime64[ns]").astype(np.int64)
+tour_time_rows = {t: r[np.argsort(times_ns[r], kind="stable")]
+                  for t, r in tour_rows.items()}
+tour_times = {t: times_ns[r] for t, r in tour_time_rows.items()}
+
+WINDOW_COLUMNS = ["lat", "lon", "boat_heading", "boat_speed", "wind_speed",
+                  "wind_dir"]
+LOCAL_TZ = "Europe/Berlin"     # bare /window times are local, like the logs
+
+POINTS_LIMIT = 5000
+POINTS_MAX_LIMIT = 50000
+
+# sampling strata (angle bin x wind band x date) of every point
+sample_strata = utsm.strata_codes(
+    df[utb.code_column(utb.DEFAULT_WIDTH)].values, df["wind_speed"].values,
+    df["date"].astype("category").cat.codes.values)
+SAMPLE_COLUMNS = ["wind_boat_angle", "speed_ratio"]
+
+# season polar (mean speed_ratio per angle bin and wind band) for /compare
+season_polar = utcmp.season_polar(df["wind_boat_angle"].values,
+                                  df["wind_speed"].values,
+                                  df["speed_ratio"].values)
+COMPARE_MODES = ("elapsed", "leg")
+COMPARE_MIN_STEP_S = 1.0    # finer grids only interpolate the 8 s data
 
 
 def load_marks():
@@ -25,6 +117,12 @@ def load_marks():
 def save_marks(data):
     with open(MARKS_FILE, "w") as f:
         json.dump(data, f, indent=2)
+    # reprocess all annotated tours; unchanged ones are cache hits
+    utm.process_marked_tours(df, data, course_cache)
+
+
+# (tour, marks version) -> roundings and course legs
+course_cache = utm.process_marked_tours(df, load_marks(), {})
 
 
 @app.route("/")
@@ -32,20 +130,311 @@ def index():
     return render_template("index.html", tours=tours)
 
 
+@app.route("/tours")
+def list_tours():
+    """
+    The tour index: ?date_from=&date_to= (YYYY-MM-DD), ?min_<col>= and
+    ?max_<col>= on any numeric column (e.g. min_distance_km=5),
+    ?sort=<col> with ?order=desc, ?limit=N.
+    """
+    args = request.args
+    try:
+        ranges = {}
+        for key, value in args.items():
+            if key.startswith(("min_", "max_")):
+                name = key[4:]
+                if name not in tour_index.columns or \
+                        tour_index[name].dtype.kind not in "iuf":
+                    raise KeyError(name)
+                lo, hi = ranges.get(name, (None, None))
+                ranges[name] = (float(value), hi) if key[:3] == "min" \
+                    else (lo, float(value))
+        limit = int(args["limit"]) if "limit" in args else None
+        if limit is not None and limit < 0:
+            return jsonify({"error": "limit must not be negative"}), 400
+        rows = uts.filter_tours(tour_index, args.get("date_from"),
+                                args.get("date_to"), ranges,
+                                sort=args.get("sort", "date"),
+                                descending=args.get("order") == "desc",
+                                limit=limit)
+    except KeyError as e:
+        return jsonify({"error": f"unknown column {e.args[0]}"}), 400
+    except ValueError:
+        return jsonify({"error": "numeric min_/max_/limit required"}), 400
+
+    return utsv.json_response(request, {
+        "count": int(len(rows)),
+        "total": int(len(tour_index)),
+        "tours": rows.to_dict("records"),
+    })
+
+
 @app.route("/get_track/<path:tour>")
 def get_track(tour):
-    subset = df[df["gpx_path"] == tour]
-
-    points = subset[["lat", "lon"]].values.tolist()
+    """
+    Track of a tour with its marks. ?format=polyline returns the track as
+    an encoded polyline, ?format=binary (or Accept: application/
+    octet-stream) the binary buffer of utils_transport without marks.
+    """
+    fmt = request.args.get("format")
+    if fmt is None and request.accept_mimetypes.best == \
+            "application/octet-stream":
+        fmt = "binary"
+
+    if fmt == "binary":
+        return Response(track_binary.get(tour, uttr.encode_binary([], [])),
+                        mimetype="application/octet-stream")
+    if fmt == "polyline":
+        return utsv.json_response(request, {
+            "polyline": track_polyline.get(tour, ""),
+            "marks": load_marks().get(tour, [])
+        })
+
+    rows = tour_rows.get(tour, [])
+
+    points = latlon[rows]
 
     marks = load_marks().get(tour, [])
 
-    return jsonify({
-        "points": points,
-        "marks": marks
+    return utsv.streamed_json_response(
+        request, utsv.iter_json_object({"marks": marks}, {"points": points}))
+
+
+@app.route("/marks/<path:tour>")
+def get_marks(tour):
+    return jsonify(load_marks().get(tour, []))
+
+
+@app.route("/points")
+def points_in_bbox():
+    """
+    Points of all tours inside ?bbox=west,south,east,north (Leaflet's
+    toBBoxString order). Optional ?cols=lat,lon,speed_ratio and ?limit=N.
+    """
+    try:
+        west, south, east, north = map(float, request.args["bbox"].split(","))
+        limit = min(int(request.args.get("limit", POINTS_LIMIT)),
+                    POINTS_MAX_LIMIT)
+    except (KeyError, ValueError):
+        return jsonify({"error": "bbox=west,south,east,north required"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be at least 1"}), 400
+
+    cols = request.args.get("cols", "lat,lon").split(",")
+    unknown = [c for c in cols if c not in df.columns]
+    if unknown:
+        return jsonify({"error": f"unknown columns: {unknown}"}), 400
+
+    idx = grid.query(south, west, north, east)
+    subset = df.iloc[idx[:limit]]
+
+    return utsv.json_response(request, {
+        "count": int(len(idx)),
+        "truncated": bool(len(idx) > limit),
+        "columns": {c: subset[c].to_numpy() for c in cols}
+    })
+
+
+@app.route("/sample")
+def sample():
+    """
+    Stratified sample of at most ?n= points of all tours (strata: angle
+    bin, wind band, date), reproducible by ?seed=. ?cols= selects the
+    columns; "weight" is the number of points each sampled point stands
+    for in its stratum.
+    """
+    try:
+        n = min(int(request.args.get("n", POINTS_LIMIT)), POINTS_MAX_LIMIT)
+        seed = int(request.args.get("seed", 0))
+    except ValueError:
+        return jsonify({"error": "integer n and seed required"}), 400
+    if n < 0 or seed < 0:
+        return jsonify({"error": "n and seed must not be negative"}), 400
+
+    cols = request.args.get("cols", ",".join(SAMPLE_COLUMNS)).split(",")
+    unknown = [c for c in cols if c not in df.columns]
+    if unknown:
+        return jsonify({"error": f"unknown columns: {unknown}"}), 400
+
+    rows, weight = utsm.stratified_sample(sample_strata, n, seed)
+    return utsv.json_response(request, {
+        "count": int(len(df)),
+        "sampled": int(len(rows)),
+        "seed": seed,
+        "weight": weight,
+        "columns": {c: df[c].to_numpy()[rows] for c in cols}
+    })
+
+
+def tour_columns(tour):
+    """The columns utils_compare needs of one tour, in time order."""
+    rows = tour_time_rows[tour]
+    return {c: df[c].values[rows] for c in utcmp.COLUMNS}
+
+
+@functools.lru_cache(maxsize=256)
+def comparison(a, b, mode, step_s, marks_key):
+    """Memoized by tour pair, parameters and the marks of both tours."""
+    cols_a = tour_columns(a)
+    series_a = utcmp.series(cols_a)
+    if b == "season":
+        series_b = utcmp.expected_series(cols_a, season_polar)
+    else:
+        series_b = utcmp.series(tour_columns(b))
+    if mode == "elapsed":
+        return utcmp.compare_elapsed(series_a, series_b, step_s)
+
+    marks = load_marks()
+    rounds_a = utcmp.leg_times(cols_a, marks.get(a, []))
+    # the season has no roundings: its leg times come from expected VMG
+    rounds_b = None if b == "season" else \
+        utcmp.leg_times(tour_columns(b), marks.get(b, []))
+    return utcmp.compare_legs(series_a, series_b, rounds_a, rounds_b)
+
+
+@app.route("/compare")
+def compare():
+    """
+    ?a=<tour>&b=<tour or "season"> minus each other per instant (boat
+    speed, speed_ratio, VMG) with gain/loss summaries. ?mode=elapsed
+    (default, ?step= seconds, at least 1) aligns by elapsed time,
+    ?mode=leg by the legs between mark roundings.
+    """
+    a, b = request.args.get("a"), request.args.get("b", "season")
+    for tour in (a, b):
+        if tour not in tour_time_rows and tour != "season":
+            return jsonify({"error": f"unknown tour {tour}"}), 404
+    if a == "season":
+        return jsonify({"error": "a must be a tour"}), 400
+    mode = request.args.get("mode", "elapsed")
+    if mode not in COMPARE_MODES:
+        return jsonify({"error": f"mode must be one of {COMPARE_MODES}"}), 400
+    try:
+        step_s = float(request.args.get("step", utcmp.STEP_S))
+    except ValueError:
+        return jsonify({"error": "numeric step required"}), 400
+    if not (np.isfinite(step_s) and step_s >= COMPARE_MIN_STEP_S):
+        return jsonify({"error": f"step must be a number of at least "
+                                 f"{COMPARE_MIN_STEP_S:g} s"}), 400
+
+    marks_key = None
+    if mode == "leg":
+        marks = load_marks()
+        marks_key = tuple(utm.marks_version(marks.get(t, [])) for t in (a, b))
+    try:
+        result = comparison(a, b, mode, step_s, marks_key)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return utsv.json_response(request, {"a": a, "b": b, "mode": mode,
+                                        **result})
+
+
+def parse_window_time(value, day):
+    """
+    ISO timestamp (naive = UTC), or HH:MM[:SS] Europe/Berlin time on the
+    tour's local day; ns since epoch, UTC.
+    """
+    if "-" not in value and "T" not in value:
+        ts = pd.Timestamp(f"{day}T{value}").tz_localize(LOCAL_TZ)
+    else:
+        ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.value
+
+
+def downsample(times, fps):
+    """Positions of the first point of every 1/fps s frame."""
+    frame = (times - times[0]) // max(1, int(1e9 / fps))
+    return np.flatnonzero(np.diff(frame, prepend=-1))
+
+
+@app.route("/window")
+def window():
+    """
+    Points of ?tour= between ?from= and ?to= (ISO timestamps, or HH:MM:SS
+    Berlin time on the tour's day), sorted by time. ?fps=N keeps at most one
+    point per 1/N s of tour time; ?cols= selects the columns.
+    """
+    tour = request.args.get("tour")
+    if tour not in tour_times:
+        return jsonify({"error": f"unknown tour {tour}"}), 404
+
+    times = tour_times[tour]
+    day = pd.Timestamp(times[0], tz="UTC").tz_convert(LOCAL_TZ) \
+        .date().isoformat() if len(times) else ""
+    try:
+        start = parse_window_time(request.args["from"], day)
+        end = parse_window_time(request.args["to"], day)
+        fps = float(request.args["fps"]) if "fps" in request.args else None
+    except (KeyError, ValueError):
+        return jsonify({"error": "from=...&to=... required"}), 400
+    if fps is not None and not (np.isfinite(fps) and fps > 0):
+        return jsonify({"error": "fps must be a positive number"}), 400
+
+    cols = request.args.get("cols", ",".join(WINDOW_COLUMNS)).split(",")
+    unknown = [c for c in cols if c not in df.columns or c == "time"]
+    if unknown:
+        return jsonify({"error": f"unknown columns: {unknown}"}), 400
+
+    lo = np.searchsorted(times, start, side="left")
+    hi = np.searchsorted(times, end, side="right")
+    keep = np.arange(lo, hi)
+    if fps is not None and hi > lo:
+        keep = lo + downsample(times[lo:hi], fps)
+    rows = tour_time_rows[tour][keep]
+
+    return utsv.json_response(request, {
+        "tour": tour,
+        "count": int(hi - lo),
+        "time_ms": times[keep] // 1_000_000,
+        "columns": {c: df[c].to_numpy()[rows] for c in cols}
     })
 
 
+@app.route("/tiles/<layer>/<int:z>/<int:x>/<int:y>.png")
+def heatmap_tile(layer, z, x, y):
+    """Heatmap tile of a layer (speed_ratio, boat_speed); 204 if empty."""
+    if layer not in uttl.LAYERS:
+        return jsonify({"error": f"unknown layer {layer}"}), 404
+    png = uttl.render_png(TILE_DIR, layer, z, x, y)
+    if png is None:
+        return Response(status=204)
+    return Response(png, mimetype="image/png",
+                    headers={"Cache-Control": "max-age=3600"})
+
+
+@app.route("/tiles/<int:z>/<int:x>/<int:y>.bin")
+def heatmap_tile_array(z, x, y):
+    """Counts and per-layer means of a tile (see utils_tiles.tile_array)."""
+    arrays = uttl.load_tile(TILE_DIR, z, x, y)
+    if arrays is None:
+        return Response(status=204)
+    body = uttl.tile_array(arrays)
+    headers = {"Vary": "Accept-Encoding"}
+    if utsv.accepts_gzip(request):
+        body = zlib.compress(body, utsv.GZIP_LEVEL, wbits=31)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype="application/octet-stream",
+                    headers=headers)
+
+
+@app.route("/course/<path:tour>")
+def course(tour):
+    marks = load_marks().get(tour, [])
+    if not marks:
+        return jsonify({"error": f"no marks for {tour}"}), 404
+
+    key = (tour, utm.marks_version(marks))
+    if key not in course_cache:
+        utm.process_marked_tours(df, load_marks(), course_cache)
+    if key not in course_cache:
+        return jsonify({"error": f"unknown tour {tour}"}), 404
+
+    return jsonify(course_cache[key])
+
+
 @app.route("/save_mark", methods=["POST"])
 def save_mark():
     data = request.json
@@ -85,6 +474,7 @@ def delete_mark():
     return jsonify({"status": "ok"})
 
 
-
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # development server only; production: gunicorn -c gunicorn.conf.py app:app
+    app.run(host="0.0.0.0", port=5000,
+            debug=os.environ.get("FLASK_DEBUG", "1") == "1")
@@ -0,0 +1,64 @@
+"""
+Propose race windows for every GPX file of a folder.
+
+Each whole track is run through utils_race.detect_race_window in a
+process pool and the windows are saved to race_windows.json, which
+regattas_dataset.py reads for the files it has no hand-entered times
+for. Entries with "source": "manual" are never replaced, and files that
+already have a detected window are skipped unless --force is given.
+"""
+
+import argparse
+import glob
+import os
+import utils_gpx as utgpx
+import utils_parallel as utpar
+import utils_race as utr
+
+RACE_DIR = "data/inputs/regattas"
+WINDOWS_FILE = "data/inputs/race_windows.json"
+
+
+def detect(args):
+    """Worker: proposed window of one file, or None."""
+    gpx_path, min_speed_ms = args
+    try:
+        points = utgpx.get_gpx_points(gpx_path)
+    except ValueError:
+        return gpx_path, None
+    return gpx_path, utr.detect_race_window(points,
+                                            min_speed_ms=min_speed_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dir", default=RACE_DIR)
+    parser.add_argument("--windows", default=WINDOWS_FILE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-speed", type=float, default=utr.MIN_SPEED_MS,
+                        help="sustained speed threshold in m/s")
+    parser.add_argument("--force", action="store_true",
+                        help="re-detect files with a detected window")
+    args = parser.parse_args()
+
+    windows = utr.load_windows(args.windows)
+    files = sorted(glob.glob(os.path.join(args.dir, "*.gpx")))
+    todo = [f for f in files if f not in windows or
+            (args.force and windows[f].get("source") != "manual")]
+    print(f"{len(files)} GPX files, {len(todo)} to detect")
+
+    with utpar.process_pool(args.workers) as pool:
+        for gpx_path, w in pool.map(detect, [(f, args.min_speed)
+                                                  for f in todo]):
+            name = os.path.basename(gpx_path)
+            if w is None:
+                print(f"  {name}: no race found")
+                continue
+            windows[gpx_path] = {"start_time": w["start_time"],
+                                 "end_time": w["end_time"],
+                                 "maneuvers": w["maneuvers"],
+                                 "source": "detected"}
+            print(f"  {name}: {w['start_time']} - {w['end_time']} "
+                  f"({w['maneuvers']} maneuvers)")
+
+    utr.save_windows(windows, args.windows)
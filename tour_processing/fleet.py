@@ -0,0 +1,101 @@
+"""
+Fleet mode: align the tracked boats of each race on one time grid.
+
+Races are listed in data/inputs/fleet_races.json:
+
+    [{"race": "2025-06-04", "start_time": "18:00:00", "end_time": "20:05:00",
+      "boats": [{"name": "GER 12", "gpx_path": "data/inputs/fleet/a.gpx"},
+                {"name": "GER 31", "gpx_path": "data/inputs/fleet/b.gpx"}],
+      "marks": [{"label": "S", "lat": ..., "lon": ...}, ...]}]
+
+"marks" is optional (same form as marks.json, at least two marks);
+without it progress is measured towards the wind. Boats without fixes
+in the window are skipped; a race left with fewer than two boats is
+skipped too. For every race the grid (one row per boat and
+grid time, with rank and distance to the leader) and the per-leg gains
+are written to data/outputs/fleet/.
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import time
+import numpy as np  # type: ignore
+import utils_fleet as utfl
+import utils_wind as utw
+import utils_windfield as utwf
+
+RACES_FILE = "data/inputs/fleet_races.json"
+OUT_DIR = "data/outputs/fleet"
+WIND_DAYS = "data/inputs/wind/days"
+WIND_CSV = "data/inputs/wind/wind_data.csv"
+WIND_STATIONS = "data/inputs/wind/stations.json"
+
+
+def run_race(race, out_dir):
+    start_t = time.fromisoformat(race["start_time"])
+    end_t = time.fromisoformat(race["end_time"])
+    date = re.search(r"\d{4}-\d{2}-\d{2}",
+                     race.get("date", race["race"])).group(0)
+
+    boats = {}
+    for b in race["boats"]:
+        try:
+            boats[b["name"]] = utfl.load_boat(b["gpx_path"], start_t, end_t)
+        except ValueError as e:
+            print(f"  {b['name']}: skipped ({e})")
+    if len(boats) < 2:
+        raise ValueError(f"{len(boats)} boats with fixes in the window, "
+                         "at least 2 needed")
+    grid = utfl.align(boats)
+
+    wind_field = utwf.load_wind_field(WIND_CSV, WIND_STATIONS, date)
+    if wind_field is not None:
+        grid.join_wind(wind_field=wind_field)
+    else:
+        grid.join_wind(wind_data=utw.get_wind_range(WIND_DAYS, date,
+                                                    time(17, 0), time(22, 0)))
+
+    rounded = None
+    if race.get("marks"):
+        progress, rounded = utfl.course_progress(grid, race["marks"])
+    else:
+        progress = utfl.wind_progress(grid)
+
+    frame = grid.frame()
+    ok = grid.valid
+    frame["progress_m"] = progress[ok].round(1)
+    frame["rank"] = utfl.rankings(progress)[ok]
+    frame["distance_to_leader_m"] = utfl.distance_to_leader(progress)[ok] \
+        .round(1)
+    legs = utfl.leg_gains(grid, progress, utfl.leg_bounds(grid, rounded))
+
+    os.makedirs(out_dir, exist_ok=True)
+    frame.to_csv(os.path.join(out_dir, f"{race['race']}_grid.csv"),
+                 index=False)
+    legs.to_csv(os.path.join(out_dir, f"{race['race']}_legs.csv"),
+                index=False)
+    final = legs[legs["leg"] == legs["leg"].max()]
+    return len(grid.names), len(grid.epoch), final
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--races", default=RACES_FILE)
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    args = parser.parse_args()
+
+    with open(args.races) as f:
+        races = json.load(f)
+
+    for race in races:
+        try:
+            n_boats, n_times, final = run_race(race, args.out_dir)
+        except ValueError as e:
+            print(f"{race['race']}: skipped ({e})")
+            continue
+        print(f"{race['race']}: {n_boats} boats x {n_times} grid times")
+        for _, row in final.sort_values("rank_end").iterrows():
+            rank = "-" if np.isnan(row["rank_end"]) else int(row["rank_end"])
+            print(f"  {rank:>2}  {row['boat']}")
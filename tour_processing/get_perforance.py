@@ -1,7 +1,7 @@
 """
 Load sailing performance dataset
 and ensure required columns exist,
-INCLUDING angle_bin as string.
+INCLUDING angle_bin (categorical) and integer bin codes.
 """
 
 import pandas as pd
@@ -45,10 +45,15 @@ for col in numeric_cols:
 
 
 # --------------------------------------------------
-# 4️⃣ Ensure angle_bin is string
+# 4️⃣ Angle-bin codes (int8) at every resolution
 # --------------------------------------------------
 
-df["angle_bin"] = df["angle_bin"].astype(str)
+import utils_bins as utb
+
+for col, codes in utb.angle_bin_columns(df["wind_boat_angle"].values).items():
+    df[col] = codes
+# labels only for display and the uploaded documents
+df["angle_bin"] = utb.as_categorical(df[utb.code_column(utb.DEFAULT_WIDTH)])
 
 
 # --------------------------------------------------
@@ -66,11 +71,13 @@ df = df[
         "lon",
         "speed_ratio",
         "start_time",
+        "time",
         "wind_boat_angle",
         "angle_bin",
         "wind_dir",
         "wind_speed",
     ]
+    + [utb.code_column(w) for w in utb.BIN_WIDTHS]
 ]
 
 
@@ -91,3 +98,77 @@ output_path = "data/outputs/all_sailing_performance_clean.csv"
 df.to_csv(output_path, index=False)
 
 print(f"Saved clean dataset to: {output_path}")
+
+
+# --------------------------------------------------
+# 8️⃣ Pre-aggregated summaries per date and tour
+# --------------------------------------------------
+
+import utils_summary as uts
+
+summary_dir = "data/outputs/summaries"
+summaries = uts.build_summaries(df)
+uts.save_summaries(summaries, summary_dir)
+
+print(f"Saved {len(summaries)} date summaries to: {summary_dir}")
+
+
+# --------------------------------------------------
+# 9️⃣ Sync the memory-mapped point store (new and changed tours only)
+# --------------------------------------------------
+
+import utils_store as utst
+
+store = utst.PointStore("data/outputs/point_store")
+appended, replaced, removed = store.sync(df)
+
+print(f"Point store: {appended} tours appended, {replaced} replaced, "
+      f"{removed} removed, {len(store)} points total")
+
+# the tour index follows the store: one summary row per stored tour
+tour_index, indexed = uts.update_tour_index(store)
+print(f"Tour index: {indexed} tours summarized, "
+      f"{len(tour_index)} tours total")
+
+
+# --------------------------------------------------
+# 🔟 Polar envelope sketches (per tour, merged per season)
+# --------------------------------------------------
+
+import utils_polar as utp
+
+sketch_dir = "data/outputs/polar_sketches"
+season, built = utp.build_sketches(store.path,
+                                   [t["tour"] for t in store.tours],
+                                   sketch_dir)
+season.envelope().to_csv("data/outputs/polar_envelope.csv", index=False)
+utp.plot_polar_envelope(season, q=0.9,
+                        out_file="data/outputs/plots/polar_envelope_p90.png")
+
+print(f"Polar sketches: {built} tours sketched, season envelope saved")
+
+
+# --------------------------------------------------
+# 1️⃣1️⃣ Heatmap tiles (only tiles touched by new tours are rewritten)
+# --------------------------------------------------
+
+import utils_tiles as uttl
+
+binned, written = uttl.update_tiles("data/outputs/heatmap_tiles", store)
+print(f"Heatmap tiles: {binned} tours binned, {written} tiles written")
+
+
+# --------------------------------------------------
+# 1️⃣2️⃣ Bootstrap confidence intervals of the mean speed ratio
+# --------------------------------------------------
+
+import utils_bootstrap as utbs
+
+ci_table = utbs.polar_bootstrap(df["wind_boat_angle"].values,
+                                df["wind_speed"].values,
+                                df["speed_ratio"].values)
+ci_table.to_csv("data/outputs/polar_bootstrap.csv", index=False)
+utbs.plot_polar_bands(ci_table,
+                      out_file="data/outputs/plots/polar_mean_ci.png")
+
+print(f"Polar bootstrap: {len(ci_table)} cells, {utbs.N_BOOT} replicates")
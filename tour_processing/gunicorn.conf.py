@@ -0,0 +1,17 @@
+# Production serving of app.py:
+#     gunicorn -c gunicorn.conf.py app:app
+#
+# The dataset is loaded once before forking (preload_app), so the workers
+# share its pages copy-on-write instead of each parsing the CSV.
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+preload_app = True
+timeout = 60
+keepalive = 5
+accesslog = "-"
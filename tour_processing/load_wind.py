@@ -1,48 +1,161 @@
-import json
-import firebase_admin  # type: ignore
-from firebase_admin import credentials, firestore  # type: ignore
-from google.cloud.firestore_v1._helpers import Timestamp   # type: ignore
+"""
+Incremental sync of the Firestore `wind_data` collection.
 
-# Initialize Firebase
-cred = credentials.Certificate("inputs/firebase/serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
+Every date document is written to its own compact file
+inputs/wind/days/<date>.json, which utils_wind reads one date at a time.
+The last synced date and the update time of every synced document are
+kept in inputs/wind/days/_sync_state.json, so a nightly run only pages
+through the documents from OVERLAP_DAYS before the last synced date
+onwards: recent dates may still have been growing or revised, and
+documents whose update time did not change are not rewritten. Older
+revisions are picked up by --full.
 
-# Firestore client
-db = firestore.client()
+Usage:
+    python load_wind.py            # incremental
+    python load_wind.py --full     # page through the whole collection
 
-# Fetch wind_data collection
-collection_ref = db.collection('wind_data')
-docs = collection_ref.stream()
+Set FIRESTORE_EMULATOR_HOST to run against the local emulator.
+"""
+
+import argparse
+import json
+import os
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from google.cloud.firestore_v1._helpers import Timestamp   # type: ignore
+
+DAYS_DIR = "inputs/wind/days"
+STATE_FILE = "_sync_state.json"
+OVERLAP_DAYS = 7        # trailing dates fetched again on incremental runs
 
 
 # Helper function to convert Firestore data to JSON-serializable
 def serialize(obj):
     if isinstance(obj, Timestamp):
         return obj.ToDatetime().isoformat()
+    if isinstance(obj, dict):
+        return {k: serialize(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [serialize(v) for v in obj]
     if hasattr(obj, "isoformat"):  # handle datetime objects
         return obj.isoformat()
     return obj
 
 
-data = {}
-for doc in docs:
-    # recursively convert nested dicts
-    def convert(d):
-        for k, v in d.items():
-            if isinstance(v, dict):
-                convert(v)
-            elif isinstance(v, list):
-                for i in range(len(v)):
-                    if hasattr(v[i], "isoformat"):
-                        v[i] = v[i].isoformat()
-            elif hasattr(v, "isoformat"):
-                d[k] = v.isoformat()
-        return d
-
-    data[doc.id] = convert(doc.to_dict())
-
-# Save as JSON
-with open("inputs/wind/wind_data.json", "w") as f:
-    json.dump(data, f, indent=2)
-
-print("Data saved to inputs/wind/wind_data.json")
+def load_state(days_dir):
+    path = os.path.join(days_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"last_date": None, "updated": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(days_dir, state):
+    path = os.path.join(days_dir, STATE_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def sync_start(last_date, overlap_days=OVERLAP_DAYS):
+    """First date id an incremental run fetches (None = from the start)."""
+    if not last_date:
+        return None
+    start = date.fromisoformat(last_date) - timedelta(days=overlap_days)
+    return start.isoformat()
+
+
+def update_stamp(snapshot):
+    stamp = getattr(snapshot, "update_time", None)
+    return stamp.isoformat() if stamp is not None else None
+
+
+def write_day(days_dir, snapshot):
+    """Write one date document as compact JSON (atomic replace)."""
+    path = os.path.join(days_dir, f"{snapshot.id}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(serialize(snapshot.to_dict()), f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return snapshot.id, update_stamp(snapshot)
+
+
+def fetch_page(collection_ref, since, after, page_size):
+    """
+    One page of date documents ordered by id (ids are YYYY-MM-DD, so
+    id order is date order). The first page starts at `since`, the
+    following ones right after the last snapshot of the previous page.
+    """
+    query = collection_ref.order_by("__name__").limit(page_size)
+    if after is not None:
+        query = query.start_after(after)
+    elif since:
+        query = query.start_at({"__name__": collection_ref.document(since)})
+    return list(query.get())
+
+
+def sync(collection_ref, days_dir=DAYS_DIR, page_size=50, workers=4,
+         full=False, overlap_days=OVERLAP_DAYS):
+    """
+    Fetch date documents from overlap_days before the last synced date
+    on, page by page, and write the changed ones to per-date files.
+
+    The next page is fetched while the current one is written by a pool
+    of `workers` threads, so memory and open requests stay bounded by the
+    page size. Returns the list of written dates.
+    """
+    os.makedirs(days_dir, exist_ok=True)
+    state = load_state(days_dir)
+    since = None if full else sync_start(state.get("last_date"),
+                                         overlap_days)
+    updated = state.setdefault("updated", {})
+
+    written = []
+    with ThreadPoolExecutor(max_workers=workers + 1) as pool:
+        page = fetch_page(collection_ref, since, None, page_size)
+        while page:
+            # prefetch the next page while this one is being written
+            next_page = None
+            if len(page) == page_size:
+                next_page = pool.submit(fetch_page, collection_ref, since,
+                                        page[-1], page_size)
+
+            changed = [s for s in page
+                       if update_stamp(s) is None
+                       or updated.get(s.id) != update_stamp(s)]
+            for doc_id, stamp in pool.map(lambda s: write_day(days_dir, s),
+                                          changed):
+                updated[doc_id] = stamp
+                written.append(doc_id)
+
+            last_id = page[-1].id
+            if state.get("last_date") is None or last_id > state["last_date"]:
+                state["last_date"] = last_id
+            save_state(days_dir, state)
+            print(f"Synced page up to {last_id} "
+                  f"({len(changed)}/{len(page)} changed)")
+
+            page = next_page.result() if next_page is not None else []
+
+    return written
+
+
+if __name__ == "__main__":
+    import utils_firestore as utfs
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--full", action="store_true",
+                        help="page through the whole collection")
+    parser.add_argument("--days-dir", default=DAYS_DIR)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--overlap-days", type=int, default=OVERLAP_DAYS,
+                        help="trailing dates fetched again (incremental)")
+    args = parser.parse_args()
+
+    db = utfs.get_client()
+    written = sync(db.collection("wind_data"), args.days_dir,
+                   page_size=args.page_size, workers=args.workers,
+                   full=args.full, overlap_days=args.overlap_days)
+    print(f"{len(written)} date files written to {args.days_dir}")
@@ -0,0 +1,81 @@
+"""
+Local load test of /get_track against a running app.py.
+
+Picks the smallest, median and largest tour of the dataset and hammers
+each with concurrent clients, reporting requests per second and p50/p99
+latency. Start the server first, e.g.
+    gunicorn -c gunicorn.conf.py app:app
+    python loadtest.py --url http://localhost:5000 --clients 16
+"""
+
+import argparse
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np  # type: ignore
+import pandas as pd
+
+TRACK_FILE = "data/outputs/all_sailing_performance_clean.csv"
+
+
+def pick_tours(track_file):
+    sizes = pd.read_csv(track_file, usecols=["gpx_path"])["gpx_path"] \
+        .value_counts().sort_values()
+    picks = {sizes.index[0], sizes.index[len(sizes) // 2], sizes.index[-1]}
+    return [(tour, int(sizes[tour])) for tour in sizes.index if tour in picks]
+
+
+def fetch(url, gzip):
+    headers = {"Accept-Encoding": "gzip"} if gzip else {}
+    req = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    with urllib.request.urlopen(req) as resp:
+        n = len(resp.read())
+    return time.perf_counter() - start, n
+
+
+def run(url, clients, duration, gzip):
+    """Keep `clients` requests in flight for `duration` seconds."""
+    latencies, sizes = [], []
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            latency, n = fetch(url, gzip)
+            latencies.append(latency)
+            sizes.append(n)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for fut in [pool.submit(client) for _ in range(clients)]:
+            fut.result()
+    elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1000
+    return {
+        "requests": len(lat),
+        "rps": len(lat) / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "bytes": int(np.mean(sizes)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--track-file", default=TRACK_FILE)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'requests':>9} {'req/s':>8} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'bytes':>9}  tour")
+    for tour, n_points in pick_tours(args.track_file):
+        url = f"{args.url}/get_track/{urllib.parse.quote(tour)}"
+        r = run(url, args.clients, args.duration, not args.no_gzip)
+        print(f"{n_points:>8} {r['requests']:>9} {r['rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['bytes']:>9}  "
+              f"{tour.split('/')[-1]}")
@@ -0,0 +1,41 @@
+"""
+Dataset of one long GPX log (full day or multi-day), in bounded memory.
+
+Same rows as regattas_dataset.py produces for a tour, written chunk by
+chunk with utils_chunked.process_gpx_chunked, e.g.
+    python process_long_gpx.py data/inputs/long/day.gpx out.csv \
+        --start 08:00 --end 20:00 --chunk-size 100000
+"""
+
+import argparse
+import re
+from datetime import time
+import utils_chunked as utc
+import utils_wind as utw
+import utils_windfield as utwf
+
+WIND_DAYS = "data/inputs/wind/days"
+WIND_CSV = "data/inputs/wind/wind_data.csv"
+WIND_STATIONS = "data/inputs/wind/stations.json"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("gpx_path")
+    parser.add_argument("out_csv")
+    parser.add_argument("--start", type=time.fromisoformat, default=None,
+                        help="Europe/Berlin time of day, whole log if unset")
+    parser.add_argument("--end", type=time.fromisoformat, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    date = re.search(r"\d{4}-\d{2}-\d{2}", args.gpx_path).group(0)
+    wind_data = utw.get_wind_range(WIND_DAYS, date, time(0, 0), time(23, 59))
+    wind_field = utwf.load_wind_field(WIND_CSV, WIND_STATIONS, date)
+
+    n = utc.process_gpx_chunked(
+        args.gpx_path, args.start, args.end, wind_data, args.out_csv,
+        wind_field=wind_field, chunk_size=args.chunk_size,
+        metadata={"gpx_path": args.gpx_path, "start_time": args.start,
+                  "end_time": args.end})
+    print(f"Wrote {n} rows to {args.out_csv}")
@@ -0,0 +1,25 @@
+"""
+Reprocess the course legs of every tour annotated in marks.json in one
+batch and save them to data/outputs/course_legs.csv.
+"""
+
+import json
+import pandas as pd
+import utils_marks as utm
+
+TRACK_FILE = "data/outputs/all_sailing_performance_clean.csv"
+MARKS_FILE = "marks.json"
+OUTPUT_FILE = "data/outputs/course_legs.csv"
+
+df = pd.read_csv(TRACK_FILE)
+df["time"] = pd.to_datetime(df["time"], format="mixed", utc=True)
+with open(MARKS_FILE) as f:
+    all_marks = json.load(f)
+
+cache = utm.process_marked_tours(df, all_marks, {})
+rows = [dict(gpx_path=tour, version=version, **leg)
+        for (tour, version), result in cache.items()
+        for leg in result["legs"]]
+pd.DataFrame(rows).to_csv(OUTPUT_FILE, index=False)
+print(f"Processed {len(cache)} annotated tours, "
+      f"{len(rows)} legs saved to {OUTPUT_FILE}")
@@ -1,17 +1,30 @@
 import utils_wind as utw
 import utils_gpx as utgpx
 import utils as ut
+import utils_legs as utl
+import utils_windfield as utwf
+import utils_plots as utpl
+import utils_race as utr
+import utils_bootstrap as utbs
 from datetime import time
 from datetime import datetime
 import re
 
+# Multi-station wind: CSV from downloadWindData.js + station positions.
+# When both exist, wind is interpolated in space and time per track point.
+WIND_CSV = "data/inputs/wind/wind_data.csv"
+WIND_STATIONS = "data/inputs/wind/stations.json"
+
+# Race windows proposed by detect_races.py (or entered there by hand)
+RACE_WINDOWS = "data/inputs/race_windows.json"
+
 
 def extract_date(path):
     match = re.search(r'\d{4}-\d{2}-\d{2}', path)
     return match.group(0) if match else None
 
 
-def performance(wind_path, gpx_path, start_time, end_time):
+def performance(wind_path, gpx_path, start_time, end_time, plot_jobs=None):
 
     date = extract_date(gpx_path)
     wind_data = utw.get_wind_range(wind_path, date, time(17, 0, 0),
@@ -26,14 +39,23 @@ def performance(wind_path, gpx_path, start_time, end_time):
                                                acc_trsh=2,
                                                downsamp_s=8)
 
-    dataset = ut.compute_wind_boat_dataset(p_t, s_clean, wind_data)
-
-    filename = f"data/outputs/plots/speed_ratio_vs_angle_{date}.png"
-    ut.plot_speed_ratio_vs_angle(dataset,
-                                 out_file=filename)
-    filename = f"data/outputs/plots/polar_speed_ratio_{date}.png"
-    ut.plot_polar_speed_ratio(dataset,
-                              out_file=filename)
+    wind_field = utwf.load_wind_field(WIND_CSV, WIND_STATIONS, date)
+
+    dataset = ut.compute_track_dataset(p_t, s_clean, wind_data,
+                                       wind_field=wind_field)
+
+    # Plots are rendered later, in parallel, by the plot stage
+    if plot_jobs is not None:
+        columns = ["wind_boat_angle", "speed_ratio"]
+        filename = f"data/outputs/plots/speed_ratio_vs_angle_{date}.png"
+        plot_jobs.append(utpl.plot_job("plot_speed_ratio_vs_angle",
+                                       filename, dataset, columns))
+        filename = f"data/outputs/plots/polar_speed_ratio_{date}.png"
+        bands = utbs.angle_bands(dataset["wind_boat_angle"],
+                                 dataset["speed_ratio"], workers=1)
+        plot_jobs.append(utpl.plot_job("plot_polar_speed_ratio",
+                                       filename, dataset, columns,
+                                       bands=bands))
     return dataset
 
 
@@ -80,33 +102,69 @@ sailing_data = [
     }
 ]
 
+# Hand-entered windows above are manual overrides; the other GPX files
+# use the windows from RACE_WINDOWS
+manual = {sdata["gpx_path"] for sdata in sailing_data}
+for gpx_path, window in utr.load_windows(RACE_WINDOWS).items():
+    if gpx_path not in manual:
+        sailing_data.append({"gpx_path": gpx_path,
+                             "start_time": window["start_time"],
+                             "end_time": window["end_time"]})
+
 
 import pandas as pd
 import matplotlib.pyplot as plt   # type: ignore
 import numpy as np   # type: ignore
 
 all_rows = []
+n_rows = 0
+all_legs = []
+all_maneuvers = []
+plot_jobs = []
 
 for sdata in sailing_data:
     gpx_path = sdata["gpx_path"]
     start_time = sdata["start_time"]
     end_time = sdata["end_time"]
 
-    dataset = performance("data/inputs/wind/wind_data.json", gpx_path, start_time, end_time)
+    dataset = performance("data/inputs/wind/days", gpx_path, start_time,
+                          end_time, plot_jobs=plot_jobs)
 
     # Add metadata to each row (optional, but useful)
-    for row in dataset:
-        row["gpx_path"] = gpx_path
-        row["start_time"] = start_time
-        row["end_time"] = end_time
-
-    all_rows.extend(dataset)
+    rows = ut.dataset_frame(dataset)
+    rows["gpx_path"] = gpx_path
+    rows["start_time"] = start_time
+    rows["end_time"] = end_time
+
+    # Leg index: offsets point into all_sailing_performance.csv rows
+    legs = utl.leg_index(dataset.times(), dataset["boat_heading"],
+                         dataset["wind_dir"], dataset["boat_speed"],
+                         dataset["speed_ratio"])
+    maneuvers = utl.detect_maneuvers(dataset["boat_heading"],
+                                     dataset["wind_dir"])
+    legs[["start", "end"]] += n_rows
+    maneuvers["offset"] += n_rows
+    legs.insert(0, "gpx_path", gpx_path)
+    maneuvers.insert(0, "gpx_path", gpx_path)
+    all_legs.append(legs)
+    all_maneuvers.append(maneuvers)
+
+    all_rows.append(rows)
+    n_rows += len(rows)
 
 # Combine everything into one DataFrame
-df_all = pd.DataFrame(all_rows)
+df_all = pd.concat(all_rows, ignore_index=True)
 
 # Save to CSV
 df_all.to_csv("data/outputs/all_sailing_performance.csv", index=False)
+pd.concat(all_legs, ignore_index=True).to_csv(
+    "data/outputs/all_sailing_legs.csv", index=False)
+pd.concat(all_maneuvers, ignore_index=True).to_csv(
+    "data/outputs/all_sailing_maneuvers.csv", index=False)
+
+# Plot stage: per-date plots whose inputs changed, rendered in parallel
+rendered, skipped = utpl.render_plots(plot_jobs)
+print(f"Plots: {rendered} rendered, {skipped} up to date")
 
 
 # Ensure `time` is a datetime
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the utils_* modules are imported flat, as the scripts do
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
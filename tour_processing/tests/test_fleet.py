@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+import utils_fleet as utfl
+import utils_track as uttk
+
+
+def boat(lat0):
+    n = 20
+    epoch = np.arange(n, dtype=np.int64) * 8_000_000_000
+    track = uttk.Track(np.full(n, lat0) + np.arange(n) * 1e-4,
+                       np.full(n, 13.16), epoch)
+    return track, np.ones(n)
+
+
+def test_course_progress_needs_two_marks():
+    grid = utfl.align({"A": boat(52.44), "B": boat(52.441)})
+    with pytest.raises(ValueError, match="at least 2 marks"):
+        utfl.course_progress(grid, [{"label": "S", "lat": 52.44,
+                                     "lon": 13.16}])
+    progress, rounded = utfl.course_progress(
+        grid, [{"label": "S", "lat": 52.44, "lon": 13.16},
+               {"label": "F", "lat": 52.442, "lon": 13.16}])
+    assert rounded.shape == (2, 2)
+    assert np.nanmax(progress) > 0
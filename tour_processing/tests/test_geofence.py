@@ -0,0 +1,20 @@
+import numpy as np
+import utils_geofence as utgf
+import utils_track as uttk
+
+DOCK = (52.4350, 13.1600)       # first fix of every repo log
+LAND = (52.4600, 13.1450)       # west shore
+COURSE = (52.4600, 13.1610)     # middle of the race course
+
+
+def test_example_fence_drops_dock_and_land_points():
+    fence = utgf.load_geofence(utgf.EXAMPLE_WATER_AREA)
+    lat, lon = np.array([DOCK, LAND, COURSE]).T
+    assert fence.contains(lat, lon).tolist() == [False, False, True]
+
+
+def test_fence_is_opt_in():
+    track = uttk.Track([DOCK[0], LAND[0]], [DOCK[1], LAND[1]],
+                       np.array([0, 1_000_000_000]))
+    assert len(utgf.fence_track(track)) == 2
+    assert len(utgf.fence_track(track, utgf.EXAMPLE_WATER_AREA)) == 0
@@ -0,0 +1,39 @@
+import tracemalloc
+import utils_gpx as utgpx
+
+HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+          '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+          '<trk><trkseg>\n')
+FOOTER = '</trkseg></trk></gpx>\n'
+
+
+def write_gpx(path, n):
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for i in range(n):
+            f.write(f'<trkpt lat="{52.43 + i * 1e-7:.7f}" '
+                    f'lon="{13.16 + i * 1e-7:.7f}"><ele>30.0</ele>'
+                    f'<time>2025-09-03T{15 + i // 3600 % 8:02d}:'
+                    f'{i // 60 % 60:02d}:{i % 60:02d}Z</time></trkpt>\n')
+        f.write(FOOTER)
+
+
+def peak_bytes(path, chunk_size):
+    tracemalloc.start()
+    n = sum(len(track) for track in utgpx.iter_gpx_points(
+        path, chunk_size=chunk_size))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return n, peak
+
+
+def test_iter_gpx_points_memory_is_flat(tmp_path):
+    small, large = tmp_path / "small.gpx", tmp_path / "large.gpx"
+    write_gpx(small, 20_000)
+    write_gpx(large, 80_000)
+
+    n_small, peak_small = peak_bytes(small, chunk_size=1000)
+    n_large, peak_large = peak_bytes(large, chunk_size=1000)
+    assert (n_small, n_large) == (20_000, 80_000)
+    # four times the points, about the same peak
+    assert peak_large < 1.5 * peak_small
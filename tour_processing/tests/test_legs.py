@@ -0,0 +1,23 @@
+import numpy as np
+import utils_legs as utl
+
+
+def test_detect_maneuvers_empty():
+    maneuvers = utl.detect_maneuvers(np.array([]), np.array([]))
+    assert len(maneuvers) == 0
+    assert list(maneuvers.columns) == ["offset", "kind"]
+
+
+def test_leading_missing_headings_take_first_known_side():
+    # wind from 0 deg; heading 300 has the wind on starboard
+    heading = np.r_[np.full(3, np.nan), np.full(10, 300.0)]
+    wind = np.zeros(len(heading))
+    mode, side, _ = utl.point_codes(heading, wind)
+    assert (side == 1).all() and (mode == 0).all()
+    assert len(utl.detect_maneuvers(heading, wind)) == 0
+
+
+def test_tack_detected():
+    heading = np.r_[np.full(10, 300.0), np.full(10, 60.0)]
+    maneuvers = utl.detect_maneuvers(heading, np.zeros(len(heading)))
+    assert maneuvers.to_dict("records") == [{"offset": 10, "kind": "tack"}]
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import utils_bins as utb
+import utils_polar as utp
+import utils_store as utst
+
+
+def tour_frame(tour, n, seed):
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0, 180, n)
+    frame = pd.DataFrame({
+        "gpx_path": tour, "date": "2025-09-03",
+        "start_time": "17:53:00", "end_time": "19:00:00",
+        "lat": 52.45, "lon": 13.16,
+        "time": pd.date_range("2025-09-03 16:00", periods=n, freq="8s",
+                              tz="UTC"),
+        "boat_heading": 0.0, "boat_speed": 1.0,
+        "wind_speed": rng.uniform(4, 12, n), "wind_dir": 270.0,
+        "wind_boat_angle": angle, "speed_ratio": rng.uniform(0, 0.3, n),
+    })
+    for col, codes in utb.angle_bin_columns(angle).items():
+        frame[col] = codes
+    return frame
+
+
+def test_same_file_name_in_two_folders(tmp_path):
+    tours = ["data/a/race.gpx", "data/b/race.gpx"]
+    df = pd.concat([tour_frame(tours[0], 100, 1),
+                    tour_frame(tours[1], 60, 2)], ignore_index=True)
+    store = utst.PointStore(str(tmp_path / "store"))
+    store.sync(df)
+
+    sketch_dir = str(tmp_path / "sketches")
+    assert utp.sketch_path(sketch_dir, tours[0]) != \
+        utp.sketch_path(sketch_dir, tours[1])
+    season, built = utp.build_sketches(store.path, tours, sketch_dir,
+                                       workers=1)
+    assert built == 2
+    assert season.counts.sum() == 160
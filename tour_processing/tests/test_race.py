@@ -0,0 +1,26 @@
+import os
+from datetime import time
+import utils_gpx as utgpx
+import utils_race as utr
+from conftest import BASE_DIR
+
+# hand-entered race window of this log in regattas_dataset.sailing_data
+GPX = "data/inputs/regattas/2025-09-03T14-49-52.970Z_Watersports_sailing.gpx"
+ANNOTATED = (time(17, 53), time(19, 0))
+
+
+def test_detects_annotated_window():
+    points = utgpx.get_gpx_points(os.path.join(BASE_DIR, GPX))
+    w = utr.detect_race_window(points)
+    assert w is not None
+    assert w["start_time"] <= ANNOTATED[0]
+    assert w["end_time"] >= ANNOTATED[1]
+    # the race is bracketed, not the whole outing
+    assert (w["end"] - w["start"]).total_seconds() < 3 * 3600
+
+
+def test_threshold_is_in_boat_speed_units():
+    points = utgpx.get_gpx_points(os.path.join(BASE_DIR, GPX))
+    # the same track sails well under 2 m/s, so a knots-sized default
+    # would find nothing
+    assert utr.detect_race_window(points, min_speed_ms=2.0) is None
@@ -0,0 +1,25 @@
+import json
+import pytest
+import utils_windfield as utwf
+
+HEADER = "Date,Location,Time,Wind Direction,Wind Speed (kts)\n"
+
+
+def write_files(tmp_path, rows):
+    csv_path, stations_path = tmp_path / "wind.csv", tmp_path / "st.json"
+    csv_path.write_text(HEADER + "".join(r + "\n" for r in rows))
+    stations_path.write_text(json.dumps({"wannsee": {"lat": 52.43,
+                                                     "lon": 13.17}}))
+    return str(csv_path), str(stations_path)
+
+
+def test_date_without_stations_falls_back(tmp_path):
+    paths = write_files(tmp_path, ["2025-09-03,wannsee,18:00,270°,8.0"])
+    assert utwf.load_wind_field(*paths, "2025-09-03") is not None
+    assert utwf.load_wind_field(*paths, "2025-09-04") is None
+
+
+def test_malformed_csv_raises(tmp_path):
+    paths = write_files(tmp_path, ["2025-09-03,wannsee,18:00,west°,8.0"])
+    with pytest.raises(ValueError):
+        utwf.load_wind_field(*paths, "2025-09-03")
@@ -0,0 +1,220 @@
+"""
+Idempotent upload of the clean performance dataset to the Firestore
+`sailing_performance_points` collection.
+
+Every row gets a deterministic document id derived from (gpx_path, time),
+so re-uploading after a rebuild overwrites points instead of duplicating
+them. A manifest of the last uploaded row hashes is kept next to the
+dataset: only new or changed rows are written and rows that disappeared
+from the dataset are deleted. Batches are committed in parallel and
+retried on transient errors.
+
+The per-date summaries written by get_perforance.py are uploaded with
+--summaries, one small document per date in
+`sailing_performance_summaries`.
+
+Usage:
+    python upload_performance.py [--dry-run] [--summaries]
+
+Set FIRESTORE_EMULATOR_HOST to run against the local emulator.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from google.api_core import exceptions as gexc  # type: ignore
+
+CSV_PATH = "data/outputs/all_sailing_performance_clean.csv"
+MANIFEST_PATH = "data/outputs/upload_manifest.json"
+COLLECTION = "sailing_performance_points"
+SUMMARY_DIR = "data/outputs/summaries"
+SUMMARY_COLLECTION = "sailing_performance_summaries"
+
+BATCH_SIZE = 400   # Firestore allows at most 500 writes per batch
+CHECKPOINT_S = 10  # manifest save interval while uploading
+RETRYABLE = (gexc.ServiceUnavailable, gexc.DeadlineExceeded, gexc.Aborted,
+             gexc.ResourceExhausted, gexc.InternalServerError)
+
+NUMERIC_FIELDS = ["lat", "lon", "boat_speed", "wind_speed", "wind_dir",
+                  "boat_heading", "wind_boat_angle", "speed_ratio"]
+STRING_FIELDS = ["angle_bin", "date", "gpx_path", "start_time", "end_time",
+                 "time"]
+
+
+def point_id(gpx_path, t):
+    """Deterministic document id of the point recorded at t on gpx_path."""
+    return hashlib.sha1(f"{gpx_path}|{t}".encode()).hexdigest()
+
+
+def row_payload(row):
+    payload = {k: float(row[k]) for k in NUMERIC_FIELDS}
+    payload.update({k: str(row[k]) for k in STRING_FIELDS})
+    return payload
+
+
+def payload_hash(payload):
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def diff_rows(df, manifest):
+    """
+    Compare the dataset with the manifest.
+
+    Returns (upserts, deletes): upserts is a list of
+    (doc_id, payload, hash) for new or changed rows, deletes the ids that
+    were uploaded before but are no longer in the dataset.
+    """
+    rows = {}
+    for row in df.to_dict("records"):
+        payload = row_payload(row)
+        rows[point_id(row["gpx_path"], row["time"])] = payload
+
+    upserts = []
+    for doc_id, payload in rows.items():
+        h = payload_hash(payload)
+        if manifest.get(doc_id) != h:
+            upserts.append((doc_id, payload, h))
+    deletes = [doc_id for doc_id in manifest if doc_id not in rows]
+    return upserts, deletes
+
+
+def commit_with_retry(db, collection_ref, ops, retries=5, base_delay=0.5):
+    """
+    Commit one batch of ("set", id, payload) / ("delete", id, None) ops.
+    Writes are idempotent, so a batch can simply be replayed on
+    transient errors (exponential backoff with jitter).
+    """
+    for attempt in range(retries + 1):
+        batch = db.batch()
+        for op, doc_id, payload in ops:
+            ref = collection_ref.document(doc_id)
+            if op == "set":
+                batch.set(ref, payload)
+            else:
+                batch.delete(ref)
+        try:
+            batch.commit()
+            return ops
+        except RETRYABLE:
+            if attempt == retries:
+                raise
+            time.sleep(base_delay * 2 ** attempt * (1 + random.random()))
+
+
+def upload(db, df, manifest, collection=COLLECTION, batch_size=BATCH_SIZE,
+           workers=8, manifest_path=None):
+    """
+    Upload the changed rows of df. The manifest is updated in place for
+    every batch that committed and, with manifest_path, saved (atomic
+    replace) every CHECKPOINT_S seconds and once at the end, so a killed
+    run only re-sends the last few batches (upserts are idempotent).
+    Returns (n_written, n_deleted).
+    """
+    upserts, deletes = diff_rows(df, manifest)
+    ops = [("set", doc_id, payload) for doc_id, payload, _ in upserts]
+    ops += [("delete", doc_id, None) for doc_id in deletes]
+    hashes = {doc_id: h for doc_id, _, h in upserts}
+
+    collection_ref = db.collection(collection)
+    batches = [ops[i:i + batch_size] for i in range(0, len(ops), batch_size)]
+
+    failed = None
+    saved_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(commit_with_retry, db, collection_ref, b)
+                   for b in batches]
+        for fut in as_completed(futures):
+            try:
+                done = fut.result()
+            except Exception as e:   # keep the other batches' progress
+                failed = e
+                continue
+            for op, doc_id, _ in done:
+                if op == "set":
+                    manifest[doc_id] = hashes[doc_id]
+                else:
+                    manifest.pop(doc_id, None)
+            if manifest_path is not None and \
+                    time.monotonic() - saved_at >= CHECKPOINT_S:
+                save_manifest(manifest, manifest_path)
+                saved_at = time.monotonic()
+
+    if manifest_path is not None:
+        save_manifest(manifest, manifest_path)
+    if failed is not None:
+        raise failed
+    return len(upserts), len(deletes)
+
+
+def upload_summaries(db, summary_dir=SUMMARY_DIR,
+                     collection=SUMMARY_COLLECTION):
+    """
+    One document per date. Tour keys are gpx paths, which Firestore does
+    not accept as map keys, so tours are stored as a list.
+    """
+    collection_ref = db.collection(collection)
+    ops = []
+    for path in sorted(glob.glob(os.path.join(summary_dir, "*.json"))):
+        with open(path) as f:
+            summary = json.load(f)
+        summary["tours"] = [dict(gpx_path=k, **v)
+                            for k, v in summary["tours"].items()]
+        ops.append(("set", summary["date"], summary))
+    for i in range(0, len(ops), BATCH_SIZE):
+        commit_with_retry(db, collection_ref, ops[i:i + BATCH_SIZE])
+    return len(ops)
+
+
+if __name__ == "__main__":
+    import utils_firestore as utfs
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only report what would be uploaded")
+    parser.add_argument("--summaries", action="store_true",
+                        help="also upload the per-date summaries")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    manifest = load_manifest(args.manifest)
+    print(f"Loaded {len(df)} rows, {len(manifest)} already uploaded.")
+
+    if args.dry_run:
+        upserts, deletes = diff_rows(df, manifest)
+        print(f"Would write {len(upserts)} rows and delete {len(deletes)}.")
+    else:
+        try:
+            written, deleted = upload(utfs.get_client(), df, manifest,
+                                      workers=args.workers,
+                                      manifest_path=args.manifest)
+        finally:
+            save_manifest(manifest, args.manifest)
+        print(f"Written: {written}, deleted: {deleted}")
+
+        if args.summaries:
+            n = upload_summaries(utfs.get_client())
+            print(f"Uploaded {n} date summaries")
@@ -5,6 +5,8 @@ import math
 import folium  # type: ignore
 import matplotlib.colors as mcolors  # type: ignore
 import matplotlib.cm as cm  # type: ignore
+import utils_bins as utb
+import utils_track as uttk
 
 
 def angle_to_bin(angle, step=10, max_angle=180):
@@ -40,15 +42,24 @@ def angle_diff(a, b):
     return min(diff, 360 - diff)
 
 
-def compute_wind_boat_dataset(p_t, s_clean, wind_data):
+def bearings(lat1, lon1, lat2, lon2):
+    """bearing() over arrays."""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dlon = np.radians(lon2 - lon1)
+
+    x = np.sin(dlon) * np.cos(phi2)
+    y = np.cos(phi1) * np.sin(phi2) - \
+        np.sin(phi1) * np.cos(phi2) * np.cos(dlon)
+
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def wind_at_times(epoch, wind_data):
     """
-    p_t: list of (lat, lon, datetime)
-    s_clean: list of boat speeds
-    wind_data: list of dicts with 'time' (HH:MM), 'speed', 'deg'
-    
-    IMPROVED: Uses centered difference for smoother heading that's tangent to trajectory
+    (wind_speed, wind_dir) of wind_data records (dicts with 'time' HH:MM,
+    'speed', 'deg') interpolated at epoch ns times, on their UTC wall clock.
     """
-
     # Wind arrays (minutes since midnight)
     wind_times = np.array([
         int(datetime.strptime(w["time"], "%H:%M").hour) * 60 +
@@ -57,68 +68,93 @@ def compute_wind_boat_dataset(p_t, s_clean, wind_data):
     ])
     wind_speeds = np.array([w["speed"] for w in wind_data])
     wind_dirs = np.array([w["deg"] for w in wind_data])
+    minutes = (np.asarray(epoch) // 1_000_000_000 % 86400) / 60
+    return (np.interp(minutes, wind_times, wind_speeds),
+            np.interp(minutes, wind_times, wind_dirs))
 
-    results = []
-
-    for i, ((lat, lon, t), boat_speed) in enumerate(zip(p_t, s_clean)):
-
-        # --- interpolate wind at boat time ---
-        boat_min = t.hour * 60 + t.minute + t.second / 60
-        wind_speed = float(np.interp(boat_min, wind_times, wind_speeds))
-        wind_dir = float(np.interp(boat_min, wind_times, wind_dirs))
-
-        # --- IMPROVED: boat heading using centered difference ---
-        if i == 0:
-            # First point: use forward difference
-            if len(p_t) > 1:
-                lat2, lon2, _ = p_t[1]
-                boat_heading = bearing(lat, lon, lat2, lon2)
-            else:
-                boat_heading = np.nan
-                
-        elif i == len(p_t) - 1:
-            # Last point: use backward difference
-            lat0, lon0, _ = p_t[i - 1]
-            boat_heading = bearing(lat0, lon0, lat, lon)
-            
-        else:
-            # Middle points: centered difference (tangent to trajectory)
-            # This looks from previous point to next point
-            lat0, lon0, _ = p_t[i - 1]
-            lat2, lon2, _ = p_t[i + 1]
-            
-            # Check if points are different (avoid division issues)
-            if (lat0 != lat2 or lon0 != lon2):
-                boat_heading = bearing(lat0, lon0, lat2, lon2)
-            else:
-                boat_heading = np.nan
-
-        # --- wind–boat angle (0–180) ---
-        if not np.isnan(boat_heading):
-            wind_boat_angle = angle_diff(boat_heading, wind_dir)
-        else:
-            wind_boat_angle = np.nan
-
-        # --- speed ratio  ---
-        if wind_speed > 0:
-            speed_ratio = boat_speed / wind_speed
-        else:
-            speed_ratio = np.nan
-
-        results.append({
-            "time": t,
-            "lat": lat,
-            "lon": lon,
-            "boat_heading": boat_heading,
-            "boat_speed": float(boat_speed),
-            "wind_speed": wind_speed,
-            "wind_dir": wind_dir,
-            "wind_boat_angle": wind_boat_angle,
-            "angle_bin": angle_to_bin(wind_boat_angle),
-            "speed_ratio": speed_ratio
-        })
-
-    return results
+
+def compute_track_dataset(track, s_clean, wind_data, wind_field=None):
+    """
+    track: utils_track.Track (or list of (lat, lon, datetime))
+    s_clean: boat speeds, one per point (extra points are dropped)
+    wind_data: list of dicts with 'time' (HH:MM), 'speed', 'deg'
+    wind_field: optional utils_windfield.WindField; when given, wind is
+                interpolated in space and time from its stations and
+                wind_data is ignored
+
+    Returns the Track with the channels boat_heading, boat_speed,
+    wind_speed, wind_dir, wind_boat_angle and speed_ratio.
+    Boat heading is the centered difference, tangent to the trajectory.
+    """
+    track = uttk.as_track(track)
+    full = track
+    n = min(len(track), len(s_clean))
+    track = track[:n]
+    boat_speed = np.asarray(s_clean[:n], dtype=np.float64)
+
+    if wind_field is not None:
+        wind_speed, wind_dir = wind_field.at(track.lat, track.lon,
+                                             track.times())
+        wind_speed = np.asarray(wind_speed, dtype=np.float64)
+        wind_dir = np.asarray(wind_dir, dtype=np.float64)
+    else:
+        wind_speed, wind_dir = wind_at_times(track.epoch, wind_data)
+
+    # boat heading: forward difference at the first point, backward at
+    # the last point of the track, centered (previous -> next) elsewhere
+    lat, lon = full.lat, full.lon
+    boat_heading = np.full(n, np.nan)
+    if len(full) > 1 and n > 0:
+        boat_heading[0] = bearings(lat[0], lon[0], lat[1], lon[1])
+        mid = np.arange(1, min(n, len(full) - 1))
+        prev, nxt = mid - 1, mid + 1
+        moved = (lat[prev] != lat[nxt]) | (lon[prev] != lon[nxt])
+        boat_heading[mid] = np.where(
+            moved, bearings(lat[prev], lon[prev], lat[nxt], lon[nxt]), np.nan)
+        if n == len(full):
+            boat_heading[-1] = bearings(lat[-2], lon[-2], lat[-1], lon[-1])
+
+    # wind–boat angle (0–180)
+    diff = np.abs(boat_heading - wind_dir) % 360
+    wind_boat_angle = np.minimum(diff, 360 - diff)
+
+    # speed ratio
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed_ratio = np.where(wind_speed > 0, boat_speed / wind_speed,
+                               np.nan)
+
+    return track.with_channels(boat_heading=boat_heading,
+                               boat_speed=boat_speed,
+                               wind_speed=wind_speed,
+                               wind_dir=wind_dir,
+                               wind_boat_angle=wind_boat_angle,
+                               speed_ratio=speed_ratio)
+
+
+DATASET_COLUMNS = ["time", "lat", "lon", "boat_heading", "boat_speed",
+                   "wind_speed", "wind_dir", "wind_boat_angle", "angle_bin",
+                   "speed_ratio"]
+
+
+def dataset_frame(track):
+    """
+    DataFrame of a compute_track_dataset Track, with angle_bin as a
+    categorical of 10° labels (see utils_bins).
+    """
+    frame = track.to_frame()
+    frame["angle_bin"] = utb.as_categorical(
+        utb.angle_bin_codes(frame["wind_boat_angle"].values))
+    return frame[DATASET_COLUMNS]
+
+
+def compute_wind_boat_dataset(p_t, s_clean, wind_data, wind_field=None):
+    """
+    compute_track_dataset as a list of per-point dicts (time, lat, lon,
+    boat_heading, boat_speed, wind_speed, wind_dir, wind_boat_angle,
+    angle_bin, speed_ratio), the legacy dataset form.
+    """
+    track = compute_track_dataset(p_t, s_clean, wind_data, wind_field)
+    return dataset_frame(track).to_dict("records")
 
 
 def endpoint(lat, lon, deg, dist_nm):
@@ -295,10 +331,13 @@ def plot_speed_ratio_vs_angle(dataset, out_file="speed_ratio_vs_angle.png"):
     plt.close()
 
 
-def plot_polar_speed_ratio(dataset, out_file="polar_speed_ratio.png"):
+def plot_polar_speed_ratio(dataset, out_file="polar_speed_ratio.png",
+                           bands=None):
     """
     Plot polar diagram of speed ratio vs wind-boat angle
     FIXED: Filters pairs together to avoid size mismatch
+    bands: optional utils_bootstrap.angle_bands result, drawn as the mean
+    per angle bin with its confidence interval
     """
     # Filter out entries where EITHER angle OR ratio is NaN
     valid_data = [
@@ -323,6 +362,11 @@ def plot_polar_speed_ratio(dataset, out_file="polar_speed_ratio.png"):
 
     _, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
     ax.scatter(angles_rad, ratios_array, c=ratios_array, cmap="jet", s=50, alpha=0.8)
+    if bands and bands["angle_low"]:
+        mid = np.radians(np.asarray(bands["angle_low"]) + bands["width"] / 2)
+        ax.fill_between(mid, bands["ci_low"], bands["ci_high"],
+                        color="black", alpha=0.2, linewidth=0)
+        ax.plot(mid, bands["mean"], "-", color="black", linewidth=1.5)
 
     ax.set_theta_zero_location("N")   # 0° at top
     ax.set_theta_direction(-1)        # clockwise
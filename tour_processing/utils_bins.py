@@ -0,0 +1,59 @@
+"""
+Wind-boat angle bins as small integer codes.
+
+The code of an angle at width w is floor(angle / w), clipped to the last
+bin (angles are 0-180); -1 marks a missing angle. Codes are int8, so one
+column per resolution costs a byte per point, and aggregations are
+np.bincount calls. Labels like "40-50" are only built for display.
+"""
+
+import numpy as np  # type: ignore
+import pandas as pd
+
+MAX_ANGLE = 180
+BIN_WIDTHS = (5, 10, 15, 30)
+DEFAULT_WIDTH = 10
+
+
+def code_column(width):
+    return f"angle_bin_{width}"
+
+
+def n_bins(width):
+    return -(-MAX_ANGLE // width)
+
+
+def angle_bin_codes(angles, width=DEFAULT_WIDTH):
+    """int8 bin codes of angles (degrees), -1 where the angle is NaN."""
+    angles = np.asarray(angles, dtype=np.float64)
+    codes = np.clip(np.floor(np.nan_to_num(angles, nan=0.0) / width),
+                    0, n_bins(width) - 1).astype(np.int8)
+    codes[np.isnan(angles)] = -1
+    return codes
+
+
+def angle_bin_columns(angles, widths=BIN_WIDTHS):
+    """{angle_bin_<w>: codes} for every width, from one pass per width."""
+    return {code_column(w): angle_bin_codes(angles, w) for w in widths}
+
+
+def bin_labels(width=DEFAULT_WIDTH):
+    """Display labels of the bins: ["0-10", "10-20", ...]."""
+    lows = np.arange(n_bins(width)) * width
+    return [f"{low}-{low + width}" for low in lows]
+
+
+def as_categorical(codes, width=DEFAULT_WIDTH):
+    """Categorical with the display labels (NaN for code -1)."""
+    return pd.Categorical.from_codes(np.asarray(codes, dtype=np.int8),
+                                     bin_labels(width))
+
+
+def bin_counts(codes, width=DEFAULT_WIDTH, weights=None):
+    """Points (or summed weights) per bin; missing codes are ignored."""
+    codes = np.asarray(codes)
+    ok = codes >= 0
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)[ok]
+    return np.bincount(codes[ok].astype(np.intp), weights=weights,
+                       minlength=n_bins(width))
@@ -0,0 +1,163 @@
+"""
+Bootstrap confidence intervals of the mean speed_ratio per polar cell.
+
+Points are sorted by cell, so every cell is a contiguous segment. One
+replicate batch is a 2-D array of resample indices (replicates x
+points), each drawn inside its own cell's segment; the per-cell sums of
+all replicates are then one np.add.reduceat along the points axis. For
+season-scale data the cells are split into tasks of about TASK_POINTS
+points that run in a process pool; each task has its own seed, so the
+result does not depend on the number of workers.
+"""
+
+import matplotlib.pyplot as plt   # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd
+import utils_bins as utb
+import utils_parallel as utpar
+import utils_polar as utp
+
+N_BOOT = 1000
+CI = 0.95
+BATCH_INDICES = 1_250_000   # resample indices per batch (~10 MB each array)
+TASK_POINTS = 5000
+
+
+def _replicate_means(values, counts, n_boot, seed):
+    """(n_boot, cells) bootstrap means of cells stored back to back."""
+    rng = np.random.default_rng(seed)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    cell_of = np.repeat(np.arange(len(counts)), counts)
+    seg_start, seg_len = starts[cell_of], counts[cell_of]
+
+    means = np.empty((n_boot, len(counts)))
+    # a big cell (one task) gets fewer replicates per batch, not more memory
+    batch = max(1, BATCH_INDICES // max(1, len(values)))
+    for b in range(0, n_boot, batch):
+        n = min(batch, n_boot - b)
+        idx = seg_start + (rng.random((n, len(values))) * seg_len) \
+            .astype(np.int64)
+        means[b:b + n] = np.add.reduceat(values[idx], starts, axis=1) / counts
+    return means
+
+
+def _task(args):
+    """Worker: estimate and interval of the cells of one task."""
+    values, counts, n_boot, ci, seed = args
+    reps = _replicate_means(values, counts, n_boot, seed)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    alpha = (1 - ci) / 2
+    return (np.add.reduceat(values, starts) / counts,
+            np.quantile(reps, alpha, axis=0),
+            np.quantile(reps, 1 - alpha, axis=0))
+
+
+def bootstrap_cells(codes, values, n_boot=N_BOOT, ci=CI, seed=0,
+                    workers=None):
+    """
+    Mean and bootstrap interval of values per cell code (codes < 0 and
+    NaN values are dropped). Returns a DataFrame: cell, count, mean,
+    ci_low, ci_high.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    ok = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[ok], values[ok]
+    order = np.argsort(codes, kind="stable")
+    codes, values = codes[order], values[order]
+    cells, counts = np.unique(codes, return_counts=True)
+
+    # tasks: runs of whole cells of about TASK_POINTS points
+    ends = np.cumsum(counts)
+    cuts = np.searchsorted(ends, np.arange(TASK_POINTS, ends[-1] if
+                                           len(ends) else 0, TASK_POINTS))
+    groups = np.split(np.arange(len(cells)), np.unique(cuts + 1))
+    tasks = []
+    for i, g in enumerate(g for g in groups if len(g)):
+        lo = ends[g[0]] - counts[g[0]]
+        tasks.append((values[lo:ends[g[-1]]], counts[g], n_boot, ci,
+                      seed + i))
+
+    if len(tasks) > 1 and workers != 1:
+        with utpar.process_pool(workers) as pool:
+            results = list(pool.map(_task, tasks))
+    else:
+        results = [_task(t) for t in tasks]
+
+    if not results:
+        return pd.DataFrame(columns=["cell", "count", "mean", "ci_low",
+                                     "ci_high"])
+    mean, low, high = (np.concatenate(r) for r in zip(*results))
+    return pd.DataFrame({"cell": cells, "count": counts, "mean": mean,
+                         "ci_low": low, "ci_high": high})
+
+
+def angle_bands(wind_boat_angle, speed_ratio, width=utb.DEFAULT_WIDTH,
+                min_points=5, **kwargs):
+    """
+    Mean speed_ratio and its interval per angle bin, as plain lists
+    (the form plot parameters are passed in): angle_low, count, mean,
+    ci_low, ci_high. Bins with fewer than min_points are left out.
+    """
+    table = bootstrap_cells(utb.angle_bin_codes(wind_boat_angle, width),
+                            speed_ratio, **kwargs)
+    table = table[table["count"] >= min_points]
+    return {
+        "angle_low": (table["cell"] * width).tolist(),
+        "width": width,
+        "count": table["count"].tolist(),
+        "mean": table["mean"].round(4).tolist(),
+        "ci_low": table["ci_low"].round(4).tolist(),
+        "ci_high": table["ci_high"].round(4).tolist(),
+    }
+
+
+def polar_bootstrap(wind_boat_angle, wind_speed, speed_ratio, **kwargs):
+    """
+    Per (angle bin, wind band) cell of utils_polar: count, mean and
+    interval of speed_ratio.
+    """
+    angle = np.asarray(wind_boat_angle, dtype=np.float64)
+    wind = np.asarray(wind_speed, dtype=np.float64)
+    a = utb.angle_bin_codes(angle, utp.ANGLE_STEP).astype(np.int64)
+    w = np.clip(np.searchsorted(utp.WIND_BANDS, wind, side="right") - 1,
+                0, len(utp.WIND_BANDS) - 1)
+    codes = np.where((a >= 0) & ~np.isnan(wind),
+                     a * len(utp.WIND_BANDS) + w, -1)
+
+    table = bootstrap_cells(codes, speed_ratio, **kwargs)
+    cell = table.pop("cell")
+    table.insert(0, "angle_low", cell // len(utp.WIND_BANDS) * utp.ANGLE_STEP)
+    table.insert(1, "wind_band",
+                 np.asarray(utp.WIND_BANDS)[cell % len(utp.WIND_BANDS)])
+    return table
+
+
+def plot_polar_bands(table, out_file="polar_mean_ci.png", min_points=10):
+    """Mean speed_ratio and its interval for every wind band, polar."""
+    table = table[table["count"] >= min_points]
+
+    _, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    colors = plt.cm.viridis(np.linspace(0, 1, len(utp.WIND_BANDS)))
+    for band, color in zip(utp.WIND_BANDS, colors):
+        rows = table[table["wind_band"] == band]
+        if rows.empty:
+            continue
+        angles = np.radians(rows["angle_low"] + utp.ANGLE_STEP / 2)
+        ax.fill_between(angles, rows["ci_low"], rows["ci_high"],
+                        color=color, alpha=0.25, linewidth=0)
+        ax.plot(angles, rows["mean"], "-o", color=color, markersize=3,
+                label=f"{band}+ kts")
+
+    ax.set_theta_zero_location("N")   # 0° at top
+    ax.set_theta_direction(-1)        # clockwise
+    ax.set_thetamax(180)
+    ax.set_rlabel_position(30)
+    ax.grid(True, color="#000000", linestyle="-", linewidth=0.5)
+    ax.set_title(f"Mean Speed Ratio ({round(CI * 100)}% CI) vs Wind–Boat Angle",
+                 pad=20)
+    ax.legend(title="Wind", bbox_to_anchor=(1.1, 1.05))
+
+    plt.tight_layout()
+    plt.savefig(out_file, dpi=150, bbox_inches="tight")
+    plt.close()
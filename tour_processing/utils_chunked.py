@@ -0,0 +1,138 @@
+"""
+Bounded-memory version of gpx_pipeline + compute_track_dataset.
+
+Pass 1 streams the GPX file (utils_gpx.iter_gpx_points), downsamples it
+and computes the speeds chunk by chunk, appending lat, lon, epoch and
+speed to raw column files in a temporary directory. The acceleration
+statistics the outlier threshold needs are then summed over those files.
+
+Pass 2 reads the columns through memory maps in chunks of output rows.
+Each chunk is extended by a halo of rows on both sides, so outlier cleaning,
+smoothing and the centered-difference heading see the same neighbors as
+in the in-memory path; only the chunk's own rows are kept and appended
+to the output CSV. Peak memory depends on chunk_size, not on the length
+of the log.
+"""
+
+import os
+import tempfile
+import numpy as np  # type: ignore
+import utils as ut
+import utils_geofence as utgf
+import utils_gpx as utgpx
+import utils_track as uttk
+
+COLUMNS = {"lat": "<f8", "lon": "<f8", "epoch": "<i8", "speed": "<f8"}
+
+
+class _Columns:
+    """Append-only raw column files, read back as memory maps."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = {name: 0 for name in COLUMNS}
+
+    def append(self, name, values):
+        with open(os.path.join(self.path, name), "ab") as f:
+            f.write(np.asarray(values, dtype=COLUMNS[name]).tobytes())
+        self.rows[name] += len(values)
+
+    def read(self, name):
+        if self.rows[name] == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(os.path.join(self.path, name), dtype=COLUMNS[name],
+                         mode="r", shape=(self.rows[name],))
+
+
+def _pass1(gpx_path, start_t, end_t, downsamp_s, chunk_size, cols,
+           water_area):
+    """Stream the log, geofence and downsample it, compute the speeds."""
+    step = int(downsamp_s * 1e9)
+    last_kept = None            # epoch of the last kept point
+    prev = None                 # last kept point, to pair across chunks
+
+    for chunk in utgpx.iter_gpx_points(gpx_path, start_t, end_t, chunk_size):
+        chunk = utgf.fence_track(chunk, water_area)
+        # downsample_gpx, carrying the last kept time across chunks
+        keep = []
+        for i, t in enumerate(chunk.epoch.tolist()):
+            if last_kept is None or t - last_kept >= step:
+                keep.append(i)
+                last_kept = t
+        kept = chunk[np.array(keep, dtype=np.intp)]
+        if len(kept) == 0:
+            continue
+
+        pair = kept if prev is None else uttk.Track(
+            np.concatenate([prev.lat, kept.lat]),
+            np.concatenate([prev.lon, kept.lon]),
+            np.concatenate([prev.epoch, kept.epoch]))
+        cols.append("lat", kept.lat)
+        cols.append("lon", kept.lon)
+        cols.append("epoch", kept.epoch)
+        cols.append("speed", utgpx.get_velocity(pair))
+        prev = kept[len(kept) - 1:]
+
+
+def _acc_threshold(epoch, speeds, threshold_k, chunk_size):
+    """mean + k * std of the accelerations (as get_accelerations)."""
+    n_acc = len(speeds) - 1
+    count, total, squares = 0, 0.0, 0.0
+    for a in range(0, n_acc, chunk_size):
+        b = min(a + chunk_size, n_acc)
+        dv = np.diff(speeds[a:b + 1])
+        dt = np.diff(epoch[a + 1:b + 2]) / 1e9
+        with np.errstate(divide="ignore", invalid="ignore"):
+            acc = np.where(dt > 0, dv / dt, 0.0)
+        count += len(acc)
+        total += float(acc.sum())
+        squares += float((acc * acc).sum())
+    mean = total / count
+    std = np.sqrt(max(squares / count - mean * mean, 0.0))
+    return mean + threshold_k * std
+
+
+def process_gpx_chunked(gpx_path, start_t, end_t, wind_data, out_csv,
+                        wind_field=None, metadata=None, chunk_size=100_000,
+                        smooth_win=7, acc_trsh=2, downsamp_s=8,
+                        water_area=utgf.WATER_AREA):
+    """
+    Write the dataset rows of a GPX log to out_csv (the columns of
+    utils.dataset_frame plus metadata, e.g. gpx_path), chunk by chunk.
+    Returns the number of rows written.
+    """
+    halo = smooth_win + 2
+    with tempfile.TemporaryDirectory() as tmp:
+        cols = _Columns(tmp)
+        _pass1(gpx_path, start_t, end_t, downsamp_s, chunk_size, cols,
+               water_area)
+        lat, lon = cols.read("lat"), cols.read("lon")
+        epoch, speeds = cols.read("epoch"), cols.read("speed")
+        if len(speeds) < 2:
+            raise ValueError(f"Not enough GPX points after {start_t}")
+        threshold = _acc_threshold(epoch, speeds, acc_trsh, chunk_size)
+        n_rows = len(speeds)            # one row per speed, as in memory
+        written = 0
+        if os.path.exists(out_csv):
+            os.remove(out_csv)
+
+        for a in range(0, n_rows, chunk_size):
+            b = min(a + chunk_size, n_rows)
+            lo, hi = max(0, a - halo), min(n_rows, b + halo)
+            # points lo..hi (inclusive) pair with speeds lo..hi-1
+            track = uttk.Track(lat[lo:hi + 1], lon[lo:hi + 1],
+                               epoch[lo:hi + 1])
+            s = utgpx.clean_speeds(track, speeds[lo:hi], threshold=threshold)
+            s = utgpx.smooth_signal(s, window_size=smooth_win)
+
+            # rows near the edges of the extended range are only right
+            # at the real ends of the track; keep the chunk's own rows
+            dataset = ut.compute_track_dataset(track, s, wind_data,
+                                               wind_field=wind_field)
+            rows = ut.dataset_frame(dataset[a - lo:b - lo])
+            for key, value in (metadata or {}).items():
+                rows[key] = value
+            rows.to_csv(out_csv, mode="a", header=written == 0, index=False)
+            written += len(rows)
+
+    return written
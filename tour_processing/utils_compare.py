@@ -0,0 +1,221 @@
+"""
+Tour-versus-tour comparison.
+
+Both tours are resampled onto one grid and differenced instant by
+instant (boat speed, speed_ratio, VMG). The grid is either elapsed time
+since each tour's first point, or, with marks, a fixed number of points
+per leg between the same roundings, so legs of different length line
+up. A tour can also be held against the season polar: the expected
+speed_ratio of its angle bin and wind band at every instant.
+
+VMG is the boat speed along the wind axis, boat_speed * |cos(angle)|,
+so upwind and downwind progress count alike. Gains are the integral of
+the VMG difference (meters along the wind), turned into seconds at the
+pair's mean VMG.
+"""
+
+import numpy as np  # type: ignore
+import pandas as pd
+import utils_marks as utm
+import utils_polar as utp
+
+COLUMNS = ["lat", "lon", "time", "boat_speed", "speed_ratio", "wind_speed",
+           "wind_boat_angle"]
+STEP_S = 8              # elapsed grid step, the pipeline's downsampling
+SEGMENT_S = 60          # gain/loss summary segments on the elapsed grid
+LEG_POINTS = 50         # grid points per leg
+TOP_SEGMENTS = 3
+
+
+def series(cols):
+    """Elapsed seconds and the compared channels of one tour (time order)."""
+    t = np.asarray(cols["time"]).astype("datetime64[ns]").astype(np.int64)
+    speed = np.asarray(cols["boat_speed"], dtype=np.float64)
+    angle = np.radians(np.asarray(cols["wind_boat_angle"], dtype=np.float64))
+    return {
+        "elapsed_s": (t - t[0]) / 1e9,
+        "boat_speed": speed,
+        "speed_ratio": np.asarray(cols["speed_ratio"], dtype=np.float64),
+        "vmg": speed * np.abs(np.cos(angle)),
+    }
+
+
+def season_polar(angle, wind, ratio):
+    """Mean speed_ratio per (angle bin, wind band) over all points."""
+    a, w = _polar_cell(angle, wind)
+    ratio = np.asarray(ratio, dtype=np.float64)
+    ok = (a >= 0) & ~np.isnan(ratio)
+    flat = a[ok] * len(utp.WIND_BANDS) + w[ok]
+    size = utp.N_ANGLE * len(utp.WIND_BANDS)
+    count = np.bincount(flat, minlength=size)
+    total = np.bincount(flat, weights=ratio[ok], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (total / count).reshape(utp.N_ANGLE, len(utp.WIND_BANDS))
+
+
+def _polar_cell(angle, wind):
+    angle = np.asarray(angle, dtype=np.float64)
+    wind = np.asarray(wind, dtype=np.float64)
+    a = np.where(np.isnan(angle) | np.isnan(wind), -1,
+                 np.clip(np.nan_to_num(angle) // utp.ANGLE_STEP, 0,
+                         utp.N_ANGLE - 1)).astype(np.int64)
+    w = np.clip(np.searchsorted(utp.WIND_BANDS, wind, side="right") - 1,
+                0, len(utp.WIND_BANDS) - 1)
+    return a, w
+
+
+def expected_series(cols, polar):
+    """The tour's series as the season polar predicts it."""
+    s = series(cols)
+    a, w = _polar_cell(cols["wind_boat_angle"], cols["wind_speed"])
+    ratio = np.where(a >= 0, polar[np.maximum(a, 0), w], np.nan)
+    speed = ratio * np.asarray(cols["wind_speed"], dtype=np.float64)
+    angle = np.radians(np.asarray(cols["wind_boat_angle"], dtype=np.float64))
+    return {"elapsed_s": s["elapsed_s"], "boat_speed": speed,
+            "speed_ratio": ratio, "vmg": speed * np.abs(np.cos(angle))}
+
+
+def _resample(s, at):
+    """Channels of a series interpolated at elapsed times `at`."""
+    return {k: np.interp(at, s["elapsed_s"], v, left=np.nan, right=np.nan)
+            for k, v in s.items() if k != "elapsed_s"}
+
+
+def _differences(a, b):
+    return {f"{k}_diff": a[k] - b[k] for k in ("boat_speed", "speed_ratio",
+                                               "vmg")}
+
+
+def _gain(vmg_a, vmg_b, dt):
+    """Meters along the wind gained per grid step and their seconds."""
+    gain_m = np.nan_to_num((vmg_a - vmg_b) * dt)
+    with np.errstate(all="ignore"):
+        mean_vmg = np.nanmean(np.concatenate([vmg_a, vmg_b]))
+    return gain_m, gain_m / mean_vmg if mean_vmg > 0 else gain_m * np.nan
+
+
+def _segments(start_s, gain_m, gain_s):
+    """Gain/loss per SEGMENT_S window of the elapsed grid."""
+    seg = (start_s // SEGMENT_S).astype(np.int64)
+    n = int(seg.max()) + 1 if len(seg) else 0
+    return pd.DataFrame({
+        "start_s": np.arange(n) * SEGMENT_S,
+        "gain_m": np.bincount(seg, weights=gain_m, minlength=n).round(1),
+        "gain_s": np.bincount(seg, weights=gain_s, minlength=n).round(1),
+    })
+
+
+def _summary(diffs, gain_m, gain_s, segments):
+    with np.errstate(all="ignore"):
+        means = {f"{k}_mean": round(float(np.nanmean(v)), 4)
+                 for k, v in diffs.items()}
+    means = {k: (None if np.isnan(v) else v) for k, v in means.items()}
+    ranked = segments.sort_values("gain_m", kind="stable")
+    return {
+        **means,
+        "gain_m": round(float(gain_m.sum()), 1),
+        "gain_s": round(float(np.nansum(gain_s)), 1),
+        "best_segments": ranked.tail(TOP_SEGMENTS).iloc[::-1]
+        .to_dict("records"),
+        "worst_segments": ranked.head(TOP_SEGMENTS).to_dict("records"),
+    }
+
+
+def compare_elapsed(a, b, step_s=STEP_S):
+    """
+    a minus b on a grid of elapsed seconds covering the shorter tour
+    (a and b from series / expected_series).
+    """
+    end = min(a["elapsed_s"][-1], b["elapsed_s"][-1])
+    at = np.arange(0, end + step_s / 2, step_s)
+    ra, rb = _resample(a, at), _resample(b, at)
+    diffs = _differences(ra, rb)
+    gain_m, gain_s = _gain(ra["vmg"], rb["vmg"], step_s)
+    segments = _segments(at, gain_m, gain_s)
+    return {
+        "grid": {"elapsed_s": at, **diffs,
+                 "gain_s_cum": np.nancumsum(gain_s)},
+        "summary": _summary(diffs, gain_m, gain_s, segments),
+        "segments": segments.to_dict("records"),
+    }
+
+
+def leg_times(cols, marks):
+    """Elapsed seconds of the roundings of a tour, in rounding order."""
+    roundings = utm.find_roundings(np.asarray(cols["lat"], dtype=np.float64),
+                                   np.asarray(cols["lon"], dtype=np.float64),
+                                   marks)
+    t = np.asarray(cols["time"]).astype("datetime64[ns]").astype(np.int64)
+    return [r["label"] for r in roundings], \
+        (t[[r["offset"] for r in roundings]] - t[0]) / 1e9
+
+
+def compare_legs(a, b, rounds_a, rounds_b=None, points=LEG_POINTS):
+    """
+    a minus b leg by leg: LEG_POINTS grid points spread over each leg of
+    both tours (legs between consecutive roundings). rounds_* are
+    leg_times results; the legs compared are those of the rounding
+    sequence both tours share from the start.
+
+    Without rounds_b, b is a's expected series (expected_series) on a's
+    clock. Its leg time is then the time the expected VMG needs for the
+    distance along the wind that a made on the leg.
+    """
+    labels_a, ta = rounds_a
+    labels_b, tb = rounds_a if rounds_b is None else rounds_b
+    if min(len(ta), len(tb)) < 2:
+        raise ValueError("both tours need at least two roundings")
+    common = 0
+    for la, lb in zip(labels_a, labels_b):
+        if la != lb:
+            break
+        common += 1
+    n_legs = common - 1
+    if n_legs < 1:
+        raise ValueError(f"the tours share no leg: roundings "
+                         f"{list(labels_a)} and {list(labels_b)}")
+
+    frac = np.linspace(0, 1, points)
+    at_a = ta[:n_legs, None] + frac * np.diff(ta)[:n_legs, None]
+    at_b = tb[:n_legs, None] + frac * np.diff(tb)[:n_legs, None]
+    ra, rb = _resample(a, at_a.ravel()), _resample(b, at_b.ravel())
+    diffs = _differences(ra, rb)
+    leg = np.repeat(np.arange(n_legs), points)
+
+    def leg_mean(values):
+        ok = ~np.isnan(values)
+        with np.errstate(all="ignore"):
+            return np.bincount(leg[ok], weights=values[ok],
+                               minlength=n_legs) / \
+                np.bincount(leg[ok], minlength=n_legs)
+
+    elapsed_a = np.diff(ta)[:n_legs]
+    if rounds_b is None:
+        # the grid is even in time, so mean VMG * leg time = meters made
+        vmg_a, vmg_b = leg_mean(ra["vmg"]), leg_mean(rb["vmg"])
+        with np.errstate(all="ignore"):
+            elapsed_b = np.where(vmg_b > 0, elapsed_a * vmg_a / vmg_b,
+                                 np.nan)
+    else:
+        elapsed_b = np.diff(tb)[:n_legs]
+
+    legs = pd.DataFrame({
+        "leg": np.arange(n_legs),
+        "from": labels_a[:n_legs], "to": labels_a[1:n_legs + 1],
+        "elapsed_a_s": elapsed_a.round(1),
+        "elapsed_b_s": elapsed_b.round(1),
+        "gain_s": (elapsed_b - elapsed_a).round(1),   # > 0: a was faster
+        **{f"{k}_mean": leg_mean(v).round(4) for k, v in diffs.items()},
+    })
+    with np.errstate(all="ignore"):
+        means = {f"{k}_mean": round(float(np.nanmean(v)), 4)
+                 for k, v in diffs.items()}
+    return {
+        "grid": {"leg": leg, "leg_fraction": np.tile(frac, n_legs),
+                 **diffs},
+        "summary": {**{k: (None if np.isnan(v) else v)
+                       for k, v in means.items()},
+                    "gain_s": round(float(np.nansum(elapsed_b - elapsed_a)),
+                                    1)},
+        "legs": legs.replace({np.nan: None}).to_dict("records"),
+    }
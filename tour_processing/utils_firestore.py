@@ -0,0 +1,25 @@
+import os
+import firebase_admin  # type: ignore
+from firebase_admin import credentials, firestore  # type: ignore
+from google.cloud import firestore as gcloud_firestore  # type: ignore
+
+KEY_PATH = "inputs/firebase/serviceAccountKey.json"
+EMULATOR_PROJECT = "demo-whereismywind"
+
+
+def get_client(key_path=KEY_PATH):
+    """
+    Firestore client for the scripts in tour_processing.
+
+    When FIRESTORE_EMULATOR_HOST is set (e.g. "localhost:8080") the client
+    talks to the local Firestore emulator and no service account key is
+    needed, so syncs and uploads can be tried without touching production.
+    """
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        project = os.environ.get("GCLOUD_PROJECT", EMULATOR_PROJECT)
+        return gcloud_firestore.Client(project=project)
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(key_path)
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
@@ -0,0 +1,237 @@
+"""
+Fleet mode: several boats of one race on a shared time grid.
+
+Every boat's track (from gpx_pipeline) is resampled onto the same grid,
+giving dense boats x time arrays of lat, lon, boat speed and heading;
+cells outside a boat's recording are NaN. Wind is joined once for the
+whole grid and speed_ratio follows from it. Progress along the course
+(or towards the wind when there are no marks) then gives distances to
+the leader, rankings at every grid time and per-leg gains, all as array
+operations over the boats axis.
+"""
+
+import numpy as np  # type: ignore
+import pandas as pd
+import utils as ut
+import utils_gpx as utgpx
+import utils_marks as utm
+
+GRID_STEP_S = 8     # the pipeline's downsampling step
+LEG_S = 300         # leg length without marks
+
+
+class FleetGrid:
+
+    def __init__(self, names, epoch, lat, lon, boat_speed):
+        self.names = list(names)
+        self.epoch = epoch                  # (T,) int64 ns
+        self.lat = lat                      # (boats, T)
+        self.lon = lon
+        self.boat_speed = boat_speed
+        self.boat_heading = grid_headings(lat, lon)
+        self.wind_speed = np.full(lat.shape, np.nan)
+        self.wind_dir = np.full(lat.shape, np.nan)
+        self.speed_ratio = np.full(lat.shape, np.nan)
+
+    @property
+    def valid(self):
+        return ~np.isnan(self.lat)
+
+    def join_wind(self, wind_data=None, wind_field=None):
+        """
+        Wind for every grid cell at once: one interpolation over the grid
+        times for wind_data, one WindField query over all valid cells.
+        """
+        if wind_field is not None:
+            ok = self.valid
+            times = pd.to_datetime(np.broadcast_to(self.epoch, ok.shape)[ok],
+                                   utc=True)
+            speed, deg = wind_field.at(self.lat[ok], self.lon[ok], times)
+            self.wind_speed[ok] = speed
+            self.wind_dir[ok] = deg
+        else:
+            speed, deg = ut.wind_at_times(self.epoch, wind_data)
+            self.wind_speed[:] = speed
+            self.wind_dir[:] = deg
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.speed_ratio = np.where(self.wind_speed > 0,
+                                        self.boat_speed / self.wind_speed,
+                                        np.nan)
+        return self
+
+    def frame(self):
+        """Long DataFrame: one row per (boat, grid time) with data."""
+        boats, t = np.nonzero(self.valid)
+        return pd.DataFrame({
+            "boat": np.asarray(self.names)[boats],
+            "time": pd.to_datetime(self.epoch[t], utc=True),
+            "lat": self.lat[boats, t],
+            "lon": self.lon[boats, t],
+            "boat_speed": self.boat_speed[boats, t],
+            "boat_heading": self.boat_heading[boats, t],
+            "wind_speed": self.wind_speed[boats, t],
+            "wind_dir": self.wind_dir[boats, t],
+            "speed_ratio": self.speed_ratio[boats, t],
+        })
+
+
+def load_boat(gpx_path, start_t, end_t):
+    """Track and cleaned boat speed of one boat, as in regattas_dataset."""
+    pt, _, s_clean, _, _ = utgpx.gpx_pipeline(gpx_path, start_t, end_t,
+                                              smooth_win=7, acc_trsh=2,
+                                              downsamp_s=GRID_STEP_S)
+    n = min(len(pt), len(s_clean))
+    return pt[:n], np.asarray(s_clean[:n], dtype=np.float64)
+
+
+def align(boats, step_s=GRID_STEP_S):
+    """
+    FleetGrid of boats = {name: (Track, boat_speed)}, on a grid spanning
+    all of them with step_s seconds between grid times.
+    """
+    names = list(boats)
+    t0 = min(int(track.epoch[0]) for track, _ in boats.values())
+    t1 = max(int(track.epoch[-1]) for track, _ in boats.values())
+    step = int(step_s * 1e9)
+    epoch = np.arange(t0, t1 + 1, step, dtype=np.int64)
+
+    shape = (len(names), len(epoch))
+    lat, lon, speed = (np.full(shape, np.nan) for _ in range(3))
+    for b, name in enumerate(names):
+        track, boat_speed = boats[name]
+        t = track.epoch
+        for out, values in ((lat, track.lat), (lon, track.lon),
+                            (speed, boat_speed)):
+            out[b] = np.interp(epoch, t, values, left=np.nan, right=np.nan)
+    return FleetGrid(names, epoch, lat, lon, speed)
+
+
+def grid_headings(lat, lon):
+    """Centered-difference headings along the time axis (NaN-safe)."""
+    heading = np.full(lat.shape, np.nan)
+    if lat.shape[1] < 2:
+        return heading
+    heading[:, 1:-1] = ut.bearings(lat[:, :-2], lon[:, :-2],
+                                   lat[:, 2:], lon[:, 2:])
+    heading[:, 0] = ut.bearings(lat[:, 0], lon[:, 0], lat[:, 1], lon[:, 1])
+    heading[:, -1] = ut.bearings(lat[:, -2], lon[:, -2],
+                                 lat[:, -1], lon[:, -1])
+    return heading
+
+
+def _xy(grid):
+    lat0 = float(np.nanmean(grid.lat))
+    xy = utm.project(grid.lat.ravel(), grid.lon.ravel(), lat0)
+    return xy[:, 0].reshape(grid.lat.shape), xy[:, 1].reshape(grid.lat.shape)
+
+
+def wind_progress(grid):
+    """Meters made good towards the mean wind direction since the start."""
+    x, y = _xy(grid)
+    rad = np.radians(grid.wind_dir)
+    theta = np.arctan2(np.nanmean(np.sin(rad)), np.nanmean(np.cos(rad)))
+    along = x * np.sin(theta) + y * np.cos(theta)     # wind comes from theta
+    first = np.argmax(grid.valid, axis=1)
+    start = np.nanmin(along[np.arange(len(along)), first])
+    return along - start
+
+
+def course_progress(grid, marks):
+    """
+    Meters of course completed: the legs already finished plus the part
+    of the current leg covered (leg length minus distance to its mark).
+    Also returns the (boats, marks) grid index of every rounding (-1 if
+    not rounded). A course needs at least two marks (ValueError).
+    """
+    marks = utm.course_marks(marks)
+    if len(marks) < 2:
+        raise ValueError(f"a course needs at least 2 marks, "
+                         f"got {len(marks)}")
+    lat0 = float(np.nanmean(grid.lat))
+    mark_xy = utm.project([m["lat"] for m in marks],
+                          [m["lon"] for m in marks], lat0)
+    leg_len = np.hypot(*np.diff(mark_xy, axis=0).T)
+    done = np.concatenate([[0.0], np.cumsum(leg_len)])
+    x, y = _xy(grid)
+
+    rounded = np.full((len(grid.names), len(marks)), -1, dtype=np.int64)
+    progress = np.full(grid.lat.shape, np.nan)
+    for b in range(len(grid.names)):
+        cells = np.flatnonzero(grid.valid[b])
+        if len(cells) == 0:
+            continue
+        for r in utm.find_roundings(grid.lat[b, cells], grid.lon[b, cells],
+                                    marks):
+            k = next(i for i, m in enumerate(marks)
+                     if m["label"] == r["label"])
+            rounded[b, k] = cells[r["offset"]]
+
+        # marks rounded by every grid time, then the next one's distance
+        n_rounded = np.zeros(grid.lat.shape[1], dtype=np.int64)
+        for k in range(len(marks)):
+            if rounded[b, k] >= 0:
+                n_rounded[rounded[b, k]:] = k + 1
+        nxt = np.clip(n_rounded, 1, len(marks) - 1)
+        to_next = np.hypot(x[b] - mark_xy[nxt, 0], y[b] - mark_xy[nxt, 1])
+        leg_done = np.clip(leg_len[nxt - 1] - to_next, 0, None)
+        finished = n_rounded == len(marks)
+        progress[b] = np.where(finished, done[-1], done[nxt - 1] + leg_done)
+        progress[b, ~grid.valid[b]] = np.nan
+    return progress, rounded
+
+
+def rankings(progress):
+    """Rank (1 = leader) of every boat at every grid time, NaN if absent."""
+    order = np.argsort(np.where(np.isnan(progress), np.inf, -progress),
+                       axis=0)
+    ranks = np.empty(progress.shape)
+    np.put_along_axis(ranks, order,
+                      np.arange(1, progress.shape[0] + 1)[:, None]
+                      .repeat(progress.shape[1], axis=1).astype(float),
+                      axis=0)
+    ranks[np.isnan(progress)] = np.nan
+    return ranks
+
+
+def distance_to_leader(progress):
+    with np.errstate(all="ignore"):
+        return np.nanmax(progress, axis=0) - progress
+
+
+def leg_bounds(grid, rounded=None, leg_s=LEG_S):
+    """
+    Grid index boundaries of the legs: the first rounding of every mark
+    in the fleet when marks were rounded, fixed leg_s windows otherwise.
+    """
+    if rounded is not None and (rounded >= 0).any(axis=0).sum() >= 2:
+        first = np.where(rounded >= 0, rounded, np.iinfo(np.int64).max) \
+            .min(axis=0)
+        return np.unique(first[first < len(grid.epoch)])
+    step = max(1, int(leg_s / GRID_STEP_S))
+    return np.unique(np.append(np.arange(0, len(grid.epoch), step),
+                               len(grid.epoch) - 1))
+
+
+def leg_gains(grid, progress, bounds):
+    """
+    Per boat and leg: progress made, gain over the fleet mean (meters)
+    and rank at both ends of the leg.
+    """
+    start, end = bounds[:-1], bounds[1:]
+    made = progress[:, end] - progress[:, start]          # (boats, legs)
+    with np.errstate(all="ignore"):
+        gain = made - np.nanmean(made, axis=0)
+    ranks = rankings(progress)
+
+    boats, legs = np.meshgrid(np.arange(len(grid.names)),
+                              np.arange(len(start)), indexing="ij")
+    return pd.DataFrame({
+        "leg": legs.ravel(),
+        "start": pd.to_datetime(grid.epoch[start][legs.ravel()], utc=True),
+        "end": pd.to_datetime(grid.epoch[end][legs.ravel()], utc=True),
+        "boat": np.asarray(grid.names)[boats.ravel()],
+        "progress_m": made.ravel().round(1),
+        "gain_m": gain.ravel().round(1),
+        "rank_start": ranks[:, start].ravel(),
+        "rank_end": ranks[:, end].ravel(),
+    })
@@ -0,0 +1,179 @@
+"""
+Water-area geofence: drop track points on land or in the harbor.
+
+The water area is a GeoJSON file (Polygon / MultiPolygon geometries or
+a FeatureCollection of them, [lon, lat] coordinates). All rings are
+combined by the even-odd rule, so holes, islands and a harbor basin
+drawn inside the water polygon are all cut out of it.
+
+The fence is opt-in: WATER_AREA is None until a polygon traced from
+real shoreline data exists, so the pipelines keep every point by
+default. EXAMPLE_WATER_AREA is a hand-drawn outline of the Wannsee
+racing area with the harbor basin cut out, for trying the fence.
+
+A Geofence is prepared once per file:
+- a raster mask over the bounding box whose cells are outside, inside
+  or on the boundary (crossed by an edge, dilated by one cell);
+- an edge index: for every raster row, the edges whose latitude span
+  touches it (CSR arrays).
+Points in inside/outside cells are classified by one raster lookup; only
+points in boundary cells run the exact ray-casting test, against the
+few edges of their row. Both steps are plain array operations.
+"""
+
+import functools
+import json
+import os
+import numpy as np  # type: ignore
+
+WATER_AREA = None       # default of the pipelines: no fence
+EXAMPLE_WATER_AREA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "data", "inputs",
+                                  "water_area.example.geojson")
+RASTER = 1024           # cells along each side of the bounding box
+CHUNK = 200_000         # boundary points per exact-test batch
+
+OUTSIDE, INSIDE, BOUNDARY = 0, 1, 2
+
+
+def _rings(geojson):
+    """All rings of the geometries in a GeoJSON object, as (n, 2) arrays."""
+    kind = geojson["type"]
+    if kind == "FeatureCollection":
+        return [r for f in geojson["features"] for r in _rings(f)]
+    if kind == "Feature":
+        return _rings(geojson["geometry"])
+    if kind == "Polygon":
+        return [np.asarray(r, dtype=np.float64)[:, :2]
+                for r in geojson["coordinates"]]
+    if kind == "MultiPolygon":
+        return [np.asarray(r, dtype=np.float64)[:, :2]
+                for poly in geojson["coordinates"] for r in poly]
+    raise ValueError(f"Unsupported geometry type: {kind}")
+
+
+class Geofence:
+
+    def __init__(self, rings, raster=RASTER):
+        edges = []
+        for ring in rings:
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            edges.append(np.hstack([ring[:-1], ring[1:]]))
+        edges = np.vstack(edges)
+        edges = edges[(edges[:, :2] != edges[:, 2:]).any(axis=1)]
+        self.x0, self.y0, self.x1, self.y1 = edges.T
+
+        xs, ys = np.r_[self.x0, self.x1], np.r_[self.y0, self.y1]
+        self.xmin, self.ymin = xs.min(), ys.min()
+        self.nx = self.ny = raster
+        self.dx = (xs.max() - self.xmin) / raster
+        self.dy = (ys.max() - self.ymin) / raster
+
+        self._index_edges()
+        self._build_mask()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(_rings(json.load(f)))
+
+    def _cells(self, x, y):
+        col = np.floor((x - self.xmin) / self.dx).astype(np.int64)
+        row = np.floor((y - self.ymin) / self.dy).astype(np.int64)
+        return col, row
+
+    def _index_edges(self):
+        """CSR lists of the edges touching every raster row."""
+        _, lo = self._cells(0.0, np.minimum(self.y0, self.y1))
+        _, hi = self._cells(0.0, np.maximum(self.y0, self.y1))
+        lo = np.clip(lo, 0, self.ny - 1)
+        hi = np.clip(hi, 0, self.ny - 1)
+        n = hi - lo + 1
+        edge = np.repeat(np.arange(len(lo)), n)
+        row = np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(n.cumsum() - n, n)
+        order = np.argsort(row, kind="stable")
+        self.row_edges = edge[order]
+        self.row_start = np.searchsorted(row[order], np.arange(self.ny + 1))
+
+    def _build_mask(self):
+        # cells crossed by an edge: samples every half cell along it
+        length = np.maximum(np.abs(self.x1 - self.x0) / self.dx,
+                            np.abs(self.y1 - self.y0) / self.dy)
+        n = np.ceil(2 * length).astype(np.int64) + 1
+        edge = np.repeat(np.arange(len(n)), n)
+        f = (np.arange(n.sum()) - np.repeat(n.cumsum() - n, n)) / \
+            np.repeat(np.maximum(n - 1, 1), n)
+        col, row = self._cells(self.x0[edge] + f * (self.x1 - self.x0)[edge],
+                               self.y0[edge] + f * (self.y1 - self.y0)[edge])
+        boundary = np.zeros((self.ny + 2, self.nx + 2), dtype=bool)
+        boundary[np.clip(row, 0, self.ny - 1) + 1,
+                 np.clip(col, 0, self.nx - 1) + 1] = True
+        # dilate: corners clipped between two samples are neighbours
+        dilated = np.zeros_like(boundary)
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                dilated[1:-1, 1:-1] |= boundary[1 + di:self.ny + 1 + di,
+                                                1 + dj:self.nx + 1 + dj]
+        boundary = dilated[1:-1, 1:-1]
+
+        # every other cell lies wholly on one side: test its center
+        row, col = np.nonzero(~boundary)
+        inside = self._exact((col + 0.5) * self.dx + self.xmin,
+                             (row + 0.5) * self.dy + self.ymin, row)
+        self.mask = np.full((self.ny, self.nx), BOUNDARY, dtype=np.int8)
+        self.mask[row, col] = np.where(inside, INSIDE, OUTSIDE)
+
+    def _exact(self, x, y, row):
+        """Even-odd ray casting against the edges of each point's row."""
+        inside = np.zeros(len(x), dtype=bool)
+        for a in range(0, len(x), CHUNK):
+            px, py, r = x[a:a + CHUNK], y[a:a + CHUNK], row[a:a + CHUNK]
+            n = self.row_start[r + 1] - self.row_start[r]
+            point = np.repeat(np.arange(len(px)), n)
+            e = self.row_edges[np.repeat(self.row_start[r], n) +
+                               np.arange(n.sum()) -
+                               np.repeat(n.cumsum() - n, n)]
+            x0, y0, x1, y1 = self.x0[e], self.y0[e], self.x1[e], self.y1[e]
+            qx, qy = px[point], py[point]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # horizontal edges never pass the first test
+                cross = ((y0 > qy) != (y1 > qy)) & \
+                    (qx < x0 + (qy - y0) * (x1 - x0) / (y1 - y0))
+            inside[a:a + CHUNK] = np.bincount(point, weights=cross,
+                                              minlength=len(px)) % 2 == 1
+        return inside
+
+    def contains(self, lat, lon):
+        """Boolean array: which points lie on the water."""
+        x = np.asarray(lon, dtype=np.float64)
+        y = np.asarray(lat, dtype=np.float64)
+        col, row = self._cells(x, y)
+        ok = (col >= 0) & (col < self.nx) & (row >= 0) & (row < self.ny)
+        result = np.zeros(len(x), dtype=bool)
+        cls = self.mask[row[ok], col[ok]]
+        result[ok] = cls == INSIDE
+
+        edge = np.flatnonzero(ok)[cls == BOUNDARY]
+        result[edge] = self._exact(x[edge], y[edge], row[edge])
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def load_geofence(path=WATER_AREA):
+    """Geofence of the file, prepared once per process; None if missing."""
+    if path is None:
+        return None
+    if not os.path.exists(path):
+        # cached, so said once per process and file
+        print(f"No water area at {path}, geofence disabled")
+        return None
+    return Geofence.from_file(path)
+
+
+def fence_track(track, path=WATER_AREA):
+    """The points of a Track on the water (all of them without a file)."""
+    fence = load_geofence(path)
+    if fence is None:
+        return track
+    return track[fence.contains(track.lat, track.lon)]
@@ -1,14 +1,23 @@
+import xml.etree.ElementTree as ET
 import gpxpy  # type: ignore
 import folium  # type: ignore
 import pytz  # type: ignore
 from geopy.distance import geodesic  # type: ignore
 import numpy as np  # type: ignore
+import pandas as pd
 import matplotlib.cm as cm  # type: ignore
 import matplotlib.colors as mcolors  # type: ignore
 import matplotlib.pyplot as plt  # type: ignore
+import utils_track as uttk
+import utils_geofence as utgf
 
 
-def get_gpx_points(gpx_path, start_time, end_time):
+def get_gpx_points(gpx_path, start_time=None, end_time=None):
+    """
+    Track (utils_track.Track) of the points between start_time and
+    end_time (Europe/Berlin times of day); a missing bound keeps the
+    whole side, so get_gpx_points(path) returns the whole track.
+    """
     # Load GPX file
     with open(gpx_path, "r") as f:
         gpx = gpxpy.parse(f)
@@ -16,85 +25,147 @@ def get_gpx_points(gpx_path, start_time, end_time):
     berlin = pytz.timezone("Europe/Berlin")
 
     # Extract points and times after start_time
-    points_with_time = []
+    lats, lons, times = [], [], []
     for track in gpx.tracks:
         for segment in track.segments:
             for p in segment.points:
                 local_time = p.time.astimezone(berlin).time()
-                if local_time >= start_time and local_time <= end_time:
-                    points_with_time.append((p.latitude, p.longitude, p.time))
+                if (start_time is None or local_time >= start_time) and \
+                        (end_time is None or local_time <= end_time):
+                    lats.append(p.latitude)
+                    lons.append(p.longitude)
+                    times.append(p.time)
 
-    if len(points_with_time) < 2:
+    if len(times) < 2:
         raise ValueError(f"Not enough GPX points after {start_time}")
 
-    return points_with_time
+    epoch = pd.to_datetime(times, utc=True).values \
+        .astype("datetime64[ns]").astype(np.int64)
+    return uttk.Track(lats, lons, epoch)
 
 
-def downsample_gpx(points_with_time, interval_seconds=30):
-    if not points_with_time:
-        return []
+def iter_gpx_points(gpx_path, start_time=None, end_time=None,
+                    chunk_size=100_000):
+    """
+    get_gpx_points as a stream: Tracks of at most chunk_size points,
+    parsed incrementally (no gpxpy tree), so memory depends on
+    chunk_size rather than on the length of the log.
+    """
+    def flush(lats, lons, times):
+        epoch = pd.to_datetime(times, utc=True, format="ISO8601").values \
+            .astype("datetime64[ns]").astype(np.int64)
+        track = uttk.Track(lats, lons, epoch)
+        # Europe/Berlin time of day, compared like get_gpx_points does
+        local = track.times().tz_convert("Europe/Berlin")
+        tod = (local - local.normalize()).values.astype(np.int64)
+        keep = np.ones(len(track), dtype=bool)
+        if start_time is not None:
+            keep &= tod >= _time_ns(start_time)
+        if end_time is not None:
+            keep &= tod <= _time_ns(end_time)
+        return track[keep]
+
+    lats, lons, times = [], [], []
+    segment = None
+    for event, elem in ET.iterparse(gpx_path, events=("start", "end")):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if event == "start":
+            if tag == "trkseg":
+                segment = elem
+            continue
+        if tag != "trkpt":
+            if tag == "trkseg":
+                elem.clear()
+                segment = None
+            continue
+        t = next((c.text for c in elem if c.tag.endswith("time")), None)
+        if t is not None:
+            lats.append(float(elem.get("lat")))
+            lons.append(float(elem.get("lon")))
+            times.append(t.strip())
+        # a cleared trkpt still hangs in its trkseg; detach it so the
+        # parsed part of the log does not accumulate
+        if segment is not None:
+            segment.remove(elem)
+        elem.clear()
+        if len(times) >= chunk_size:
+            yield flush(lats, lons, times)
+            lats, lons, times = [], [], []
+    if times:
+        yield flush(lats, lons, times)
+
+
+def _time_ns(t):
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1_000_000_000 + \
+        t.microsecond * 1000
 
-    downsampled = [points_with_time[0]]  # always keep first point
-    last_time = points_with_time[0][2]
 
-    for pt in points_with_time[1:]:
-        current_time = pt[2]
-        if (current_time - last_time).total_seconds() >= interval_seconds:
-            downsampled.append(pt)
-            last_time = current_time
+def downsample_gpx(points_with_time, interval_seconds=30):
+    """Keep the first point and every point interval_seconds after the
+    last kept one. Accepts a Track or a list of tuples, returns a Track."""
+    track = uttk.as_track(points_with_time)
+    if len(track) == 0:
+        return track
 
-    return downsampled
+    keep = [0]  # always keep first point
+    step = int(interval_seconds * 1e9)
+    last = track.epoch[0]
+    # sequential by nature, but over a plain int64 array
+    for i, t in enumerate(track.epoch.tolist()):
+        if t - last >= step:
+            keep.append(i)
+            last = t
 
+    return track[np.array(keep)]
 
-def get_velocity(points_with_time):
-    # Compute speeds (m/s) between consecutive points
-    speeds = []
-    for i in range(1, len(points_with_time)):
-        p1 = points_with_time[i-1]
-        p2 = points_with_time[i]
-        dist_m = geodesic(p1[:2], p2[:2]).meters  # distance in meters
-        delta_t = (p2[2] - p1[2]).total_seconds()  # time difference in seconds
-        speed = dist_m / delta_t if delta_t > 0 else 0
-        speeds.append(speed)
-    [s * 1.94384 for s in speeds]
-    return speeds
-
-
-def get_accelerations(points_with_time):
-    # Convert GPX times safely to plain Python datetimes
-    times = [p[2].replace(tzinfo=None) for p in points_with_time[1:]]
-    speeds = get_velocity(points_with_time)
-    accelerations = []
-    for i in range(1, len(speeds)):
-        dv = speeds[i] - speeds[i-1]
-        dt = (times[i] - times[i-1]).total_seconds()
-        accelerations.append(dv/dt if dt > 0 else 0)
-    return accelerations
 
-
-def clean_speeds(points_with_time, speeds, threshold_k=3):
+def get_velocity(points_with_time):
+    """Speeds (m/s) between consecutive points, as an array."""
+    track = uttk.as_track(points_with_time)
+    lat, lon = track.lat.tolist(), track.lon.tolist()
+    dist_m = np.array([geodesic((lat[i - 1], lon[i - 1]),
+                                (lat[i], lon[i])).meters
+                       for i in range(1, len(track))])
+    delta_t = np.diff(track.epoch) / 1e9  # time difference in seconds
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(delta_t > 0, dist_m / delta_t, 0.0)
+
+
+def get_accelerations(points_with_time, speeds=None):
+    """Accelerations (m/s²) between consecutive speeds."""
+    track = uttk.as_track(points_with_time)
+    if speeds is None:
+        speeds = get_velocity(track)
+    dv = np.diff(speeds)
+    dt = np.diff(track.epoch[1:]) / 1e9
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(dt > 0, dv / dt, 0.0)
+
+
+def clean_speeds(points_with_time, speeds, threshold_k=3, threshold=None):
     """
     Small threshold_k (e.g., 2) → more aggressive cleaning
     (will smooth out more data, might remove valid sharp turns or gusts).
 
     Large threshold_k (e.g., 5) → more tolerant, only removes extreme spikes.
-    """
 
-    times = [p[2].replace(tzinfo=None) for p in points_with_time[1:]]
+    threshold overrides the acceleration threshold computed from these
+    speeds (the chunked pipeline passes the one of the whole track).
+    """
+    speeds = np.asarray(speeds, dtype=np.float64)
 
     # Compute accelerations
-    acc = get_accelerations(points_with_time)
-    mean, std = np.mean(acc), np.std(acc)
-    threshold = mean + threshold_k * std
+    acc = get_accelerations(points_with_time, speeds)
+    if threshold is None:
+        mean, std = np.mean(acc), np.std(acc)
+        threshold = mean + threshold_k * std
 
+    # outliers are replaced by the mean of their neighbors
     speeds_clean = speeds.copy()
-    for i in range(1, len(speeds)-1):
-        dv = speeds[i] - speeds[i-1]
-        dt = (times[i] - times[i-1]).total_seconds()
-        a = dv/dt if dt > 0 else 0
-        if abs(a) > threshold:  # outlier
-            # interpolate between neighbors
-            speeds_clean[i] = (speeds[i-1] + speeds[i+1]) / 2
+    outlier = np.zeros(len(speeds), dtype=bool)
+    outlier[1:-1] = np.abs(acc[:len(speeds) - 2]) > threshold
+    idx = np.flatnonzero(outlier)
+    speeds_clean[idx] = (speeds[idx - 1] + speeds[idx + 1]) / 2
     return speeds_clean
 
 
@@ -113,12 +184,16 @@ def normalize(values):
 
 
 def gpx_pipeline(gpx_path, start_t, end_t, smooth_win=7,
-                 acc_trsh=2, downsamp_s=8):
+                 acc_trsh=2, downsamp_s=8, water_area=utgf.WATER_AREA):
 
     points_with_time = get_gpx_points(gpx_path, start_t, end_t)
+    # Drop points on land / in the harbor (no-op unless water_area is set)
+    points_with_time = utgf.fence_track(points_with_time, water_area)
+    if len(points_with_time) < 2:
+        raise ValueError(f"Not enough GPX points on the water in {gpx_path}")
     points_with_time = downsample_gpx(points_with_time, downsamp_s)
     speeds = get_velocity(points_with_time)
-    accelerations = get_accelerations(points_with_time)
+    accelerations = get_accelerations(points_with_time, speeds)
     speeds_clean = clean_speeds(points_with_time, speeds, threshold_k=acc_trsh)
     speeds_clean = smooth_signal(speeds_clean, window_size=smooth_win)
 
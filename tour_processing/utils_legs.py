@@ -0,0 +1,131 @@
+import numpy as np  # type: ignore
+import pandas as pd
+
+UPWIND_MAX = 70     # |wind angle| below this is upwind
+DOWNWIND_MIN = 110  # |wind angle| above this is downwind
+MODES = np.array(["upwind", "reaching", "downwind"])
+SIDES = np.array(["port", "starboard"])
+LEG_COLUMNS = ["start", "end", "mode", "side", "start_time", "end_time",
+               "duration_s", "points", "boat_speed_mean", "speed_ratio_mean",
+               "wind_angle_mean"]
+
+
+def signed_wind_angle(boat_heading, wind_dir):
+    """
+    Wind angle relative to the bow in (-180, 180].
+    Positive = wind from starboard, negative = wind from port.
+    """
+    return (np.asarray(wind_dir) - np.asarray(boat_heading) + 180) % 360 - 180
+
+
+def ffill_invalid(codes, valid):
+    """
+    Replace codes at invalid positions with the last valid code. Invalid
+    positions before the first valid one take the first valid code, so a
+    tour starting without a heading gets the mode and side of its first
+    known heading. Without any valid position the codes are unchanged.
+    """
+    valid = np.asarray(valid, dtype=bool)
+    if not valid.any():
+        return codes
+    idx = np.where(valid, np.arange(len(codes)), np.argmax(valid))
+    np.maximum.accumulate(idx, out=idx)
+    return codes[idx]
+
+
+def run_starts(codes):
+    if len(codes) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([[0], np.nonzero(codes[1:] != codes[:-1])[0] + 1])
+
+
+def merge_short_runs(codes, min_len):
+    """
+    Fold runs shorter than min_len into the run before them, so heading
+    jitter around a mode or side boundary does not create fake legs.
+    """
+    if len(codes) == 0:
+        return codes
+    starts = run_starts(codes)
+    lengths = np.diff(np.append(starts, len(codes)))
+    long_run = np.repeat(lengths >= min_len, lengths)
+    long_run[:lengths[0]] = True   # nothing before the first run
+    return ffill_invalid(codes, long_run)
+
+
+def point_codes(boat_heading, wind_dir, min_points=5):
+    """
+    Per point (mode, side) codes in a single vectorized pass:
+    mode 0/1/2 = upwind/reaching/downwind, side 0/1 = port/starboard
+    tack (wind from port/starboard).
+    """
+    twa = signed_wind_angle(boat_heading, wind_dir)
+    valid = ~np.isnan(twa)
+    abs_twa = np.abs(twa)
+
+    mode = np.digitize(abs_twa, [UPWIND_MAX, DOWNWIND_MIN])
+    side = (twa > 0).astype(np.int64)
+    mode = merge_short_runs(ffill_invalid(mode, valid), min_points)
+    side = merge_short_runs(ffill_invalid(side, valid), min_points)
+    return mode, side, abs_twa
+
+
+def detect_maneuvers(boat_heading, wind_dir, min_points=5):
+    """
+    Tacks and gybes: every point where the wind changes side of the boat.
+    It is a tack when the bow passes through the wind (|angle| < 90) and
+    a gybe when the stern does.
+
+    Returns a DataFrame with columns offset, kind.
+    """
+    mode, side, abs_twa = point_codes(boat_heading, wind_dir, min_points)
+    offset = np.nonzero(side[1:] != side[:-1])[0] + 1
+    # angle at the change, or just before it if the heading is missing
+    around = np.where(np.isnan(abs_twa[offset]), abs_twa[offset - 1],
+                      abs_twa[offset])
+    kind = np.where(around < 90, "tack", "gybe")
+    return pd.DataFrame({"offset": offset, "kind": kind})
+
+
+def leg_index(times, boat_heading, wind_dir, boat_speed, speed_ratio,
+              min_points=5):
+    """
+    Split a tour into contiguous legs of constant point of sail and tack.
+
+    All arrays are per point, in time order (as from
+    compute_wind_boat_dataset). Returns a DataFrame with one row per leg:
+    start/end offsets (end exclusive) into the tour rows, mode, side,
+    start/end time, duration and mean statistics, all computed with
+    reduceat over the leg boundaries.
+    """
+    if len(times) == 0:
+        return pd.DataFrame(columns=LEG_COLUMNS)
+    times = pd.to_datetime(pd.Series(times)).values
+    boat_speed = np.asarray(boat_speed, dtype=np.float64)
+    speed_ratio = np.asarray(speed_ratio, dtype=np.float64)
+
+    mode, side, abs_twa = point_codes(boat_heading, wind_dir, min_points)
+    start = run_starts(mode * 2 + side)
+    end = np.append(start[1:], len(mode))
+    n = end - start
+
+    def mean(values):
+        ok = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(ok, values, 0.0), start)
+        counts = np.add.reduceat(ok.astype(np.int64), start)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    return pd.DataFrame({
+        "start": start,
+        "end": end,
+        "mode": MODES[mode[start]],
+        "side": SIDES[side[start]],
+        "start_time": times[start],
+        "end_time": times[end - 1],
+        "duration_s": (times[end - 1] - times[start]) / np.timedelta64(1, "s"),
+        "points": n,
+        "boat_speed_mean": mean(boat_speed),
+        "speed_ratio_mean": mean(speed_ratio),
+        "wind_angle_mean": mean(abs_twa),
+    })
@@ -0,0 +1,159 @@
+"""
+Mark roundings and course leg timing from the marks placed in app.py.
+
+Marks are visited in course order S, M1..M10, F. Each one is rounded at
+the closest approach of the first pass of the track near it after the
+previous rounding; candidate points come from a KD-tree over the track.
+"""
+
+import hashlib
+import json
+import numpy as np  # type: ignore
+import pandas as pd
+from scipy.spatial import cKDTree  # type: ignore
+
+EARTH_R = 6371000.0  # m
+ROUNDING_RADIUS_M = 150
+KTS = 1.94384  # m/s -> kts
+
+
+def label_order(label):
+    if label == "S":
+        return 0
+    if label == "F":
+        return 100
+    return int(label[1:]) if label[1:].isdigit() else 50
+
+
+def course_marks(marks):
+    return sorted(marks, key=lambda m: label_order(m["label"]))
+
+
+def marks_version(marks):
+    """Hash of a tour's marks; changes whenever a mark is added or moved."""
+    raw = json.dumps(course_marks(marks), sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def project(lat, lon, lat0):
+    """Local equirectangular projection in meters."""
+    x = np.radians(lon) * np.cos(np.radians(lat0)) * EARTH_R
+    y = np.radians(lat) * EARTH_R
+    return np.column_stack([x, y])
+
+
+def find_roundings(lat, lon, marks, radius_m=ROUNDING_RADIUS_M):
+    """
+    Offsets of the rounding of every mark, in course order.
+
+    Returns a list of dicts (label, offset, distance_m); a mark that is
+    never approached within radius_m falls back to the closest point of
+    the rest of the track.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if len(lat) == 0:
+        return []
+    lat0 = float(lat.mean())
+    xy = project(lat, lon, lat0)
+    tree = cKDTree(xy)
+
+    roundings = []
+    cursor = 0
+    for mark in course_marks(marks):
+        mxy = project(np.array([mark["lat"]]), np.array([mark["lon"]]),
+                      lat0)[0]
+        cand = np.sort(np.asarray(tree.query_ball_point(mxy, radius_m),
+                                  dtype=np.int64))
+        cand = cand[cand >= cursor]
+        if len(cand):
+            # first visit = first run of consecutive candidate points
+            breaks = np.nonzero(np.diff(cand) > 1)[0]
+            cand = cand[:breaks[0] + 1] if len(breaks) else cand
+        else:
+            cand = np.arange(cursor, len(xy))
+        dist = np.hypot(*(xy[cand] - mxy).T)
+        best = int(cand[np.argmin(dist)])
+        roundings.append({"label": mark["label"], "offset": best,
+                          "distance_m": round(float(dist.min()), 1)})
+        cursor = best
+    return roundings
+
+
+def course_legs(lat, lon, times, speed_ratio, boat_speed, marks):
+    """
+    Legs between consecutive roundings: elapsed time, distance sailed
+    (from the cumulative track distance), direct distance between the
+    roundings and mean speed ratio / boat speed.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    times = pd.to_datetime(pd.Series(times)).values
+    speed_ratio = np.asarray(speed_ratio, dtype=np.float64)
+    boat_speed = np.asarray(boat_speed, dtype=np.float64)
+
+    roundings = find_roundings(lat, lon, marks)
+    if len(roundings) < 2:
+        return roundings, []
+
+    xy = project(lat, lon, float(lat.mean()))
+    cum = np.concatenate([[0.0],
+                          np.cumsum(np.hypot(*np.diff(xy, axis=0).T))])
+
+    start = np.array([r["offset"] for r in roundings[:-1]])
+    end = np.array([r["offset"] for r in roundings[1:]])
+    elapsed = (times[end] - times[start]) / np.timedelta64(1, "s")
+    sailed = cum[end] - cum[start]
+    direct = np.hypot(*(xy[end] - xy[start]).T)
+
+    # means over [start, end] via prefix sums, NaNs ignored
+    def mean(values):
+        ok = ~np.isnan(values)
+        s = np.concatenate([[0.0], np.cumsum(np.where(ok, values, 0.0))])
+        c = np.concatenate([[0], np.cumsum(ok)])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (s[end + 1] - s[start]) / (c[end + 1] - c[start])
+
+    legs = pd.DataFrame({
+        "from": [r["label"] for r in roundings[:-1]],
+        "to": [r["label"] for r in roundings[1:]],
+        "start": start,
+        "end": end,
+        "elapsed_s": elapsed,
+        "distance_sailed_m": sailed.round(1),
+        "distance_direct_m": direct.round(1),
+        "avg_speed_kts": np.where(elapsed > 0, sailed / np.maximum(elapsed, 1)
+                                  * KTS, np.nan).round(2),
+        "speed_ratio_mean": mean(speed_ratio).round(3),
+        "boat_speed_mean": mean(boat_speed).round(2),
+    })
+    legs = legs.replace({np.nan: None})
+    return roundings, legs.to_dict("records")
+
+
+def tour_course(tour_df, marks):
+    return course_legs(tour_df["lat"].values, tour_df["lon"].values,
+                       tour_df["time"].values, tour_df["speed_ratio"].values,
+                       tour_df["boat_speed"].values, marks)
+
+
+def process_marked_tours(df, all_marks, cache):
+    """
+    (Re)compute the course of every annotated tour. cache maps
+    (tour, marks_version) to results, so only tours whose marks changed
+    are recomputed; entries of outdated versions are dropped.
+    """
+    rows = df.groupby("gpx_path", observed=True).indices
+    current = set()
+    for tour, marks in all_marks.items():
+        if tour not in rows or not marks:
+            continue
+        key = (tour, marks_version(marks))
+        current.add(key)
+        if key not in cache:
+            roundings, legs = tour_course(df.iloc[rows[tour]], marks)
+            cache[key] = {"version": key[1], "roundings": roundings,
+                          "legs": legs}
+    for key in [k for k in cache if k not in current]:
+        del cache[key]
+    return cache
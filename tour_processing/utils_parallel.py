@@ -0,0 +1,16 @@
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(workers=None, initializer=None):
+    """
+    Process pool for the batch stages.
+
+    Uses fork where available: the stages are started from top-level
+    scripts (regattas_dataset.py, get_perforance.py, ...), which spawned
+    workers would re-execute when importing the main module.
+    """
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() \
+        else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=initializer)
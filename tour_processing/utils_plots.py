@@ -0,0 +1,91 @@
+"""
+Plot rendering stage.
+
+A plot job is a dict {"plot": name of a plot function in utils,
+"out_file": path, "data": {column: array}, "params": {...}}. Its key is
+a hash of the function name, the parameters and the input arrays; the
+keys of rendered plots are kept in a manifest next to the outputs, so a
+job whose output exists with the same key is skipped. The remaining
+jobs are rendered in worker processes with the Agg backend.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np  # type: ignore
+import pandas as pd
+import utils_parallel as utpar
+
+MANIFEST = "data/outputs/plots/plot_manifest.json"
+
+
+def plot_job(plot, out_file, dataset, columns, **params):
+    """
+    Job for utils.<plot>(dataset, out_file=..., **params). dataset is a
+    Track, a DataFrame or anything else indexable by column name.
+    """
+    data = {c: np.asarray(dataset[c], dtype=np.float64) for c in columns}
+    return {"plot": plot, "out_file": out_file, "data": data,
+            "params": params}
+
+
+def job_key(job):
+    h = hashlib.sha1()
+    h.update(job["plot"].encode())
+    h.update(json.dumps(job["params"], sort_keys=True, default=str).encode())
+    for name in sorted(job["data"]):
+        values = np.ascontiguousarray(job["data"][name])
+        h.update(name.encode())
+        h.update(str(values.dtype).encode())
+        h.update(values.tobytes())
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def use_agg():
+    """Pool initializer: non-interactive matplotlib backend."""
+    import matplotlib.pyplot as plt   # type: ignore
+    plt.switch_backend("Agg")
+
+
+def _render(job):
+    """Worker: render one job."""
+    import utils as ut
+    dataset = pd.DataFrame(job["data"]).to_dict("records")
+    os.makedirs(os.path.dirname(job["out_file"]) or ".", exist_ok=True)
+    getattr(ut, job["plot"])(dataset, out_file=job["out_file"],
+                             **job["params"])
+    return job["out_file"]
+
+
+def render_plots(jobs, manifest_path=MANIFEST, workers=None):
+    """
+    Render the jobs whose output is missing or out of date in parallel.
+    Returns (rendered, skipped) counts.
+    """
+    manifest = load_manifest(manifest_path)
+    keys = {job["out_file"]: job_key(job) for job in jobs}
+    todo = [job for job in jobs
+            if manifest.get(job["out_file"]) != keys[job["out_file"]]
+            or not os.path.exists(job["out_file"])]
+
+    if todo:
+        with utpar.process_pool(workers, initializer=use_agg) as pool:
+            for out_file in pool.map(_render, todo):
+                manifest[out_file] = keys[out_file]
+        save_manifest(manifest, manifest_path)
+    return len(todo), len(jobs) - len(todo)
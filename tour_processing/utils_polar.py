@@ -0,0 +1,179 @@
+"""
+Mergeable quantile sketches of speed_ratio per (angle bin, wind band).
+
+The sketch is a fixed-grid histogram: counts[angle_bin, wind_band,
+ratio_bin]. Adding points is one bincount, merging two sketches is an
+addition, and any quantile of any cell is read from the cumulative
+counts with an error of at most half a ratio bin (0.0025), without
+keeping the raw points. Per-tour sketches are built in worker processes
+straight from the point store and merged into the season sketch.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import matplotlib.pyplot as plt   # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd
+import utils_parallel as utpar
+
+ANGLE_STEP = 10
+N_ANGLE = 180 // ANGLE_STEP
+WIND_BANDS = [0, 4, 8, 12, 16, 20]   # kts, last band is open-ended
+RATIO_MAX = 3.0                      # larger ratios go to the last bin
+N_RATIO = 600                        # 0.005 per bin
+
+
+class PolarSketch:
+
+    def __init__(self, counts=None):
+        shape = (N_ANGLE, len(WIND_BANDS), N_RATIO)
+        self.counts = np.zeros(shape, dtype=np.int64) if counts is None \
+            else counts
+
+    def add(self, wind_boat_angle, wind_speed, speed_ratio):
+        angle = np.asarray(wind_boat_angle, dtype=np.float64)
+        wind = np.asarray(wind_speed, dtype=np.float64)
+        ratio = np.asarray(speed_ratio, dtype=np.float64)
+        ok = ~(np.isnan(angle) | np.isnan(wind) | np.isnan(ratio))
+        angle, wind, ratio = angle[ok], wind[ok], ratio[ok]
+
+        a = np.clip((angle // ANGLE_STEP).astype(np.int64), 0, N_ANGLE - 1)
+        w = np.clip(np.searchsorted(WIND_BANDS, wind, side="right") - 1,
+                    0, len(WIND_BANDS) - 1)
+        r = np.clip((ratio / RATIO_MAX * N_RATIO).astype(np.int64),
+                    0, N_RATIO - 1)
+        flat = (a * len(WIND_BANDS) + w) * N_RATIO + r
+        self.counts += np.bincount(flat, minlength=self.counts.size) \
+            .reshape(self.counts.shape)
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def count(self):
+        """Points per (angle bin, wind band)."""
+        return self.counts.sum(axis=2)
+
+    def quantile(self, q):
+        """q-quantile of speed_ratio per (angle bin, wind band), NaN if empty."""
+        cum = np.cumsum(self.counts, axis=2)
+        total = cum[..., -1]
+        target = np.maximum(np.ceil(q * total), 1)[..., None]
+        idx = np.argmax(cum >= target, axis=2)
+        values = (idx + 0.5) * RATIO_MAX / N_RATIO
+        return np.where(total > 0, values, np.nan)
+
+    def envelope(self, quantiles=(0.9, 0.95), min_points=10):
+        """Long table of envelope values for cells with enough points."""
+        counts = self.count()
+        a, w = np.meshgrid(np.arange(N_ANGLE), np.arange(len(WIND_BANDS)),
+                           indexing="ij")
+        table = pd.DataFrame({
+            "angle_low": (a * ANGLE_STEP).ravel(),
+            "wind_band": np.asarray(WIND_BANDS)[w].ravel(),
+            "count": counts.ravel(),
+        })
+        for q in quantiles:
+            table[f"p{round(q * 100)}"] = self.quantile(q).ravel()
+        return table[table["count"] >= min_points].reset_index(drop=True)
+
+    def save(self, path):
+        np.savez_compressed(path, counts=self.counts)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["counts"])
+
+
+def _tour_sketch(args):
+    """Worker: sketch of one tour, read from the point store."""
+    import utils_store as utst
+    store_dir, tour = args
+    cols = utst.PointStore(store_dir).tour(
+        tour, ["wind_boat_angle", "wind_speed", "speed_ratio"])
+    return tour, PolarSketch().add(cols["wind_boat_angle"],
+                                   cols["wind_speed"], cols["speed_ratio"])
+
+
+def sketch_path(sketch_dir, tour):
+    """File of a tour's sketch: its file name plus a hash of the full
+    path, so tours with the same name in different folders stay apart."""
+    key = hashlib.sha1(tour.encode()).hexdigest()[:12]
+    return os.path.join(sketch_dir, f"{os.path.basename(tour)}.{key}.npz")
+
+
+def build_sketches(store_dir, tours, sketch_dir, workers=None):
+    """
+    Build the sketches of tours that have none yet, or whose rows changed
+    since (content hash of the store), in parallel; then merge all
+    per-tour sketches into the season sketch (season.npz). Sketch files
+    of tours not in the list are removed.
+    """
+    import utils_store as utst
+    os.makedirs(sketch_dir, exist_ok=True)
+    hashes = {t["tour"]: t["hash"] for t in utst.PointStore(store_dir).tours}
+    manifest_path = os.path.join(sketch_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    todo = [t for t in tours
+            if manifest.get(t) != hashes[t]
+            or not os.path.exists(sketch_path(sketch_dir, t))]
+    if todo:
+        with utpar.process_pool(workers) as pool:
+            for tour, sketch in pool.map(_tour_sketch,
+                                         [(store_dir, t) for t in todo]):
+                sketch.save(sketch_path(sketch_dir, tour))
+                manifest[tour] = hashes[tour]
+        # written after the sketches: a crash in between only redoes them
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    season = PolarSketch()
+    for tour in tours:
+        season.merge(PolarSketch.load(sketch_path(sketch_dir, tour)))
+    season.save(os.path.join(sketch_dir, "season.npz"))
+
+    # sketches of tours no longer listed (or under an older file name)
+    keep = {sketch_path(sketch_dir, t) for t in tours} | \
+        {os.path.join(sketch_dir, "season.npz")}
+    for path in glob.glob(os.path.join(sketch_dir, "*.npz")):
+        if path not in keep:
+            os.remove(path)
+    return season, len(todo)
+
+
+def plot_polar_envelope(sketch, q=0.9, out_file="polar_envelope.png",
+                        min_points=10):
+    """Envelope curve of every wind band on a polar plot."""
+    table = sketch.envelope((q,), min_points=min_points)
+    col = f"p{round(q * 100)}"
+
+    _, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    colors = plt.cm.viridis(np.linspace(0, 1, len(WIND_BANDS)))
+    for band, color in zip(WIND_BANDS, colors):
+        rows = table[table["wind_band"] == band]
+        if rows.empty:
+            continue
+        angles = np.radians(rows["angle_low"] + ANGLE_STEP / 2)
+        ax.plot(angles, rows[col], "-o", color=color, markersize=3,
+                label=f"{band}+ kts")
+
+    ax.set_theta_zero_location("N")   # 0° at top
+    ax.set_theta_direction(-1)        # clockwise
+    ax.set_thetamax(180)
+    ax.set_rlabel_position(30)
+    ax.grid(True, color="#000000", linestyle="-", linewidth=0.5)
+    ax.set_title(f"Speed Ratio {col} envelope vs Wind–Boat Angle", pad=20)
+    ax.legend(title="Wind", bbox_to_anchor=(1.1, 1.05))
+
+    plt.tight_layout()
+    plt.savefig(out_file, dpi=150, bbox_inches="tight")
+    plt.close()
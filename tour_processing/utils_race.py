@@ -0,0 +1,152 @@
+"""
+Race-window detection on a whole GPX track.
+
+A point is "racing" when the boat is away from the harbor and its mean
+speed over the surrounding WINDOW_S seconds is above MIN_SPEED_MS. Runs
+of racing points separated by gaps shorter than MAX_GAP_S are merged;
+the proposed race is the run of at least MIN_RACE_S with the most
+maneuvers (heading changes above MANEUVER_DEG between fixes
+MANEUVER_S apart). Rolling means and counts are prefix-sum differences,
+so a track is processed in one pass over its arrays.
+"""
+
+import json
+import os
+from datetime import time
+import numpy as np  # type: ignore
+import pytz  # type: ignore
+import utils_track as uttk
+
+BERLIN = pytz.timezone("Europe/Berlin")
+EARTH_RADIUS_M = 6371000.0
+
+WINDOW_S = 120
+MIN_SPEED_MS = 0.25      # m/s like boat_speed; the logged boats sail 0.3-1 m/s
+HARBOR_RADIUS_M = 300.0
+MANEUVER_S = 30
+MANEUVER_DEG = 60.0
+MAX_GAP_S = 300
+MIN_RACE_S = 600
+
+
+def track_arrays(points_with_time):
+    """lat, lon (deg) and epoch seconds of a Track or list of tuples."""
+    track = uttk.as_track(points_with_time)
+    return track.lat, track.lon, track.epoch / 1e9
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Haversine distance, vectorized."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp, dl = p2 - p1, np.radians(lon2 - lon1)
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def course_deg(lat1, lon1, lat2, lon2):
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dl = np.radians(lon2 - lon1)
+    x = np.sin(dl) * np.cos(p2)
+    y = np.cos(p1) * np.sin(p2) - np.sin(p1) * np.cos(p2) * np.cos(dl)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+
+def window_sums(t, values, half_width):
+    """Sum of values over [t - half_width, t + half_width] at every t."""
+    cum = np.concatenate([[0.0], np.cumsum(values)])
+    lo = np.searchsorted(t, t - half_width, side="left")
+    hi = np.searchsorted(t, t + half_width, side="right")
+    return cum[hi] - cum[lo]
+
+
+def racing_runs(racing, t, max_gap_s=MAX_GAP_S):
+    """(start, end) index pairs (end inclusive) of racing runs, gaps merged."""
+    idx = np.flatnonzero(racing)
+    if len(idx) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(t[idx]) > max_gap_s)
+    starts = np.concatenate([[idx[0]], idx[breaks + 1]])
+    ends = np.concatenate([idx[breaks], [idx[-1]]])
+    return list(zip(starts, ends))
+
+
+def detect_race_window(points_with_time, harbor=None,
+                       min_speed_ms=MIN_SPEED_MS,
+                       harbor_radius_m=HARBOR_RADIUS_M):
+    """
+    Proposed race window of a whole track, or None. harbor is (lat, lon),
+    the first fix of the track by default (recordings start at the dock).
+    Returns start/end as UTC datetimes and as Europe/Berlin times, the
+    form sailing_data and get_gpx_points use.
+    """
+    if len(points_with_time) < 3:
+        return None
+    lat, lon, t = track_arrays(points_with_time)
+    harbor = harbor or (lat[0], lon[0])
+
+    # segment speed (m/s) and course, assigned to the segment's end point
+    dt = np.diff(t)
+    seg = distance_m(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    speed = np.concatenate([[0.0], np.where(dt > 0, seg / np.where(
+        dt > 0, dt, 1), 0.0)])
+    course = np.concatenate([[np.nan], course_deg(lat[:-1], lon[:-1],
+                                                   lat[1:], lon[1:])])
+    moving = speed >= min_speed_ms
+
+    # mean speed over the surrounding window
+    n_win = window_sums(t, np.ones_like(t), WINDOW_S / 2)
+    mean_speed = window_sums(t, speed, WINDOW_S / 2) / n_win
+
+    # maneuver = course change against the fix MANEUVER_S earlier
+    prev = np.searchsorted(t, t - MANEUVER_S, side="left")
+    change = np.abs((course - course[prev] + 180) % 360 - 180)
+    turn = moving & moving[prev] & (change > MANEUVER_DEG)
+    # count the first point of each turn only
+    maneuver = turn & ~np.concatenate([[False], turn[:-1]])
+
+    away = distance_m(lat, lon, harbor[0], harbor[1]) > harbor_radius_m
+    racing = away & (mean_speed >= min_speed_ms)
+
+    cum_maneuvers = np.concatenate([[0], np.cumsum(maneuver)])
+    best = None
+    for start, end in racing_runs(racing, t):
+        if t[end] - t[start] < MIN_RACE_S:
+            continue
+        count = int(cum_maneuvers[end + 1] - cum_maneuvers[start])
+        if best is None or count > best[2]:
+            best = (start, end, count)
+    if best is None:
+        return None
+
+    start, end, count = best
+    start_dt, end_dt = points_with_time[start][2], points_with_time[end][2]
+    return {
+        "start": start_dt,
+        "end": end_dt,
+        "start_time": start_dt.astimezone(BERLIN).time().replace(
+            microsecond=0),
+        "end_time": end_dt.astimezone(BERLIN).time().replace(microsecond=0),
+        "maneuvers": count,
+        "mean_speed_ms": float(speed[start:end + 1].mean()),
+    }
+
+
+def load_windows(path):
+    """{gpx_path: {"start_time": time, "end_time": time, "source": ...}}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        raw = json.load(f)
+    return {gpx: dict(w, start_time=time.fromisoformat(w["start_time"]),
+                      end_time=time.fromisoformat(w["end_time"]))
+            for gpx, w in raw.items()}
+
+
+def save_windows(windows, path):
+    raw = {gpx: dict(w, start_time=w["start_time"].isoformat(),
+                     end_time=w["end_time"].isoformat())
+           for gpx, w in sorted(windows.items())}
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(raw, f, indent=1)
+    os.replace(tmp, path)
@@ -0,0 +1,78 @@
+"""
+Stratified subsampling for scatter views.
+
+Rows are grouped into strata (angle bin x wind band x date). The sample
+budget is split by water-filling: every stratum gets the same quota,
+capped at its size, and what small strata leave over goes to the larger
+ones, so sparse cells keep all their points. Inside a stratum the rows
+with the smallest random keys are taken. Everything is one argsort of
+(stratum, key) packed into an int64 plus array arithmetic, and the same
+seed gives the same sample.
+"""
+
+import numpy as np  # type: ignore
+import utils_bins as utb
+import utils_polar as utp
+
+
+def strata_codes(angle_codes, wind_speed, date_codes,
+                 wind_bands=utp.WIND_BANDS):
+    """
+    One int64 stratum code per row from utils_bins angle codes (-1 = no
+    angle, its own stratum), wind speed (kts) and integer date codes.
+    """
+    angle = np.asarray(angle_codes, dtype=np.int64) + 1
+    wind = np.asarray(wind_speed, dtype=np.float64)
+    band = np.clip(np.searchsorted(wind_bands, wind, side="right") - 1,
+                   0, len(wind_bands) - 1)
+    band = np.where(np.isnan(wind), len(wind_bands), band)
+    n_angle = utb.n_bins(utb.DEFAULT_WIDTH) + 1
+    n_band = len(wind_bands) + 1
+    return (np.asarray(date_codes, dtype=np.int64) * n_angle + angle) \
+        * n_band + band
+
+
+def quotas(counts, n, rng):
+    """Water-filled sample sizes per stratum, summing to min(n, total)."""
+    counts = np.asarray(counts, dtype=np.int64)
+    if n >= counts.sum():
+        return counts.copy()
+    lo, hi = 0, int(counts.max())          # largest equal cap within budget
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(counts, mid).sum() <= n:
+            lo = mid
+        else:
+            hi = mid - 1
+    quota = np.minimum(counts, lo)
+    left = n - int(quota.sum())
+    if left:
+        # one more point for `left` random strata that still have rows
+        room = np.flatnonzero(counts > quota)
+        quota[rng.choice(room, size=left, replace=False)] += 1
+    return quota
+
+
+def stratified_sample(strata, n, seed=0):
+    """
+    Row positions of a stratified sample of at most n rows (sorted) and
+    each row's weight (stratum size / stratum sample size). strata are
+    non-negative codes below 2**31, e.g. from strata_codes.
+    """
+    strata = np.asarray(strata, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    # one sort: stratum in the high bits, a random key in the low bits
+    key = (strata << 32) | rng.integers(0, 2 ** 32, len(strata))
+    order = np.argsort(key)
+    sorted_strata = strata[order]
+    start = np.flatnonzero(np.diff(sorted_strata, prepend=-1))
+    counts = np.diff(np.append(start, len(strata)))
+    quota = quotas(counts, n, rng)
+
+    cell = np.repeat(np.arange(len(start)), counts)
+    rank = np.arange(len(strata)) - start[cell]
+    picked = rank < quota[cell]
+    rows = order[picked]
+    weight = (counts / np.maximum(quota, 1))[cell[picked]]
+    keep = np.argsort(rows)
+    return rows[keep], weight[keep]
@@ -0,0 +1,93 @@
+import json
+import zlib
+import numpy as np  # type: ignore
+from flask import Response
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # plain json still works, just slower
+    orjson = None
+
+CHUNK_ROWS = 4096
+GZIP_LEVEL = 5
+GZIP_MIN_BYTES = 1024
+
+
+def dumps(obj):
+    """JSON bytes; numpy arrays and scalars are serialized natively."""
+    if orjson is not None:
+        # arrays orjson cannot encode natively (e.g. strings) go to default
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY)
+    if isinstance(obj, np.ndarray):
+        obj = obj.tolist()
+    return json.dumps(obj, default=_json_default,
+                      separators=(",", ":")).encode()
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj)} is not JSON serializable")
+
+
+def iter_json_array(values, chunk=CHUNK_ROWS):
+    """Encode a (n, ...) numpy array as a JSON array, chunk rows at a time."""
+    yield b"["
+    for start in range(0, len(values), chunk):
+        if start:
+            yield b","
+        yield dumps(values[start:start + chunk])[1:-1]
+    yield b"]"
+
+
+def iter_json_object(fields, streamed):
+    """
+    JSON object whose small `fields` are encoded at once and whose large
+    `streamed` arrays ({key: numpy array}) are encoded chunk by chunk.
+    """
+    head = dumps(fields)
+    yield head[:-1]
+    sep = b"," if len(fields) else b""
+    for key, values in streamed.items():
+        yield sep + dumps(key) + b":"
+        yield from iter_json_array(values)
+        sep = b","
+    yield b"}"
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # gzip wrapper
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def json_response(request, payload, status=200):
+    """Small JSON response, gzip-compressed when accepted and worth it."""
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(request) and len(body) >= GZIP_MIN_BYTES:
+        body = zlib.compress(body, GZIP_LEVEL, wbits=31)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, status=status, mimetype="application/json",
+                    headers=headers)
+
+
+def streamed_json_response(request, chunks):
+    """Stream JSON chunks, gzip-compressed on the fly when accepted."""
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(request):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return Response(chunks, mimetype="application/json", headers=headers)
@@ -0,0 +1,69 @@
+import numpy as np  # type: ignore
+
+
+def expand_ranges(starts, ends):
+    """Concatenation of arange(s, e) for every (s, e) pair, vectorized."""
+    lengths = ends - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return (np.repeat(starts - offsets, lengths) +
+            np.arange(lengths.sum(), dtype=np.int64))
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid over a set of points.
+
+    Points are sorted by row-major cell id, so all cells of one grid row
+    inside a bounding box form a single contiguous run that is found with
+    two binary searches. A bbox query touches one run per grid row plus
+    the candidate points, never the whole dataset.
+    """
+
+    def __init__(self, lat, lon, cell_deg=0.002):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.lat0 = float(lat.min()) if len(lat) else 0.0
+        self.lon0 = float(lon.min()) if len(lon) else 0.0
+
+        rows = self._row(lat)
+        cols = self._col(lon)
+        self.nrows = int(rows.max()) + 1 if len(rows) else 0
+        self.ncols = int(cols.max()) + 1 if len(cols) else 0
+
+        cells = rows * self.ncols + cols
+        self.order = np.argsort(cells, kind="stable")
+        self.cells = cells[self.order]
+        self.lat = lat[self.order]
+        self.lon = lon[self.order]
+
+    def _row(self, lat):
+        return np.floor((lat - self.lat0) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor((lon - self.lon0) / self.cell_deg).astype(np.int64)
+
+    def query(self, min_lat, min_lon, max_lat, max_lon):
+        """Original row positions of the points inside the bbox, sorted."""
+        if self.nrows == 0:
+            return np.empty(0, dtype=np.int64)
+        r0, r1 = self._row(np.array([min_lat, max_lat]))
+        c0, c1 = self._col(np.array([min_lon, max_lon]))
+        r0, r1 = max(r0, 0), min(r1, self.nrows - 1)
+        c0, c1 = max(c0, 0), min(c1, self.ncols - 1)
+        if r0 > r1 or c0 > c1:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(r0, r1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self.cells, rows * self.ncols + c0, "left")
+        ends = np.searchsorted(self.cells, rows * self.ncols + c1, "right")
+        cand = expand_ranges(starts, ends)
+
+        # border cells are only partly inside the bbox
+        inside = ((self.lat[cand] >= min_lat) & (self.lat[cand] <= max_lat) &
+                  (self.lon[cand] >= min_lon) & (self.lon[cand] <= max_lon))
+        return np.sort(self.order[cand[inside]])
@@ -0,0 +1,263 @@
+"""
+Columnar point store.
+
+One raw little-endian file per column plus a tour offset table:
+
+    point_store/
+        meta.json     {"version": 2, "columns": {"lat": "<f8", ...},
+                       "generation": g, "rows": N,
+                       "tours": [{"tour": gpx_path, "date": "...",
+                                  "start_time": "...", "end_time": "...",
+                                  "hash": "...", "start": s, "end": e}, ...]}
+        lat.<g>.bin, lon.<g>.bin, time.<g>.bin, ...
+
+Readers open the columns with np.memmap, so a tour slice is a zero-copy
+view and processes reading the same store share the page cache instead
+of each holding a private DataFrame. New tours are appended to the end
+of every column file; meta.json is replaced last, so a reader never sees
+a half-written tour.
+
+Every tour carries a content hash of its rows. sync() mirrors a dataset:
+new tours are appended, and when a tour changed or disappeared (or the
+column schema is not the current one) the columns are rewritten as the
+next generation of files. meta.json switches to it atomically; readers
+still mapping the old generation keep their files until they reopen.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import numpy as np  # type: ignore
+import pandas as pd
+import utils_bins as utb
+
+VERSION = 2
+COLUMNS = {
+    "lat": "<f8",
+    "lon": "<f8",
+    "time": "<i8",            # ns since epoch, UTC
+    "boat_heading": "<f8",
+    "boat_speed": "<f8",
+    "wind_speed": "<f8",
+    "wind_dir": "<f8",
+    "wind_boat_angle": "<f8",
+    "speed_ratio": "<f8",
+    "angle_bin_5": "|i1",     # utils_bins codes, -1 = no angle
+    "angle_bin_10": "|i1",
+    "angle_bin_15": "|i1",
+    "angle_bin_30": "|i1",
+}
+TOUR_FIELDS = ("start_time", "end_time")   # constant per tour
+
+
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _stored(frame, name, dtype):
+    """A frame column as the bytes the store keeps."""
+    values = frame[name]
+    if name == "time":
+        values = pd.to_datetime(values, format="mixed", utc=True) \
+            .dt.tz_localize(None).values.astype("datetime64[ns]") \
+            .astype(np.int64)
+    return np.ascontiguousarray(np.asarray(values, dtype=dtype))
+
+
+def _tour_fields(frame):
+    return {k: str(frame[k].iloc[0]) if k in frame and len(frame) else None
+            for k in TOUR_FIELDS}
+
+
+def tour_hash(frame, date, columns=COLUMNS):
+    """Content hash of one tour's rows, as they would be stored."""
+    h = hashlib.sha1()
+    h.update(json.dumps([str(date), _tour_fields(frame)],
+                        sort_keys=True).encode())
+    for name, dtype in columns.items():
+        h.update(name.encode())
+        h.update(_stored(frame, name, dtype).tobytes())
+    return h.hexdigest()
+
+
+class PointStore:
+
+    def __init__(self, path, columns=COLUMNS):
+        self.path = path
+        self.columns = dict(columns)
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = self._empty_meta(0)
+        self.tours = self.meta["tours"]
+        self._by_tour = {t["tour"]: t for t in self.tours}
+        self._maps = {}
+
+    def _empty_meta(self, generation):
+        return {"version": VERSION, "columns": dict(self.columns),
+                "generation": generation, "rows": 0, "tours": []}
+
+    @property
+    def schema_ok(self):
+        """Whether the stored files have the current layout and columns."""
+        return self.meta.get("version") == VERSION and \
+            self.meta["columns"] == self.columns
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def __contains__(self, tour):
+        return tour in self._by_tour
+
+    def _file(self, name, generation=None):
+        if generation is None:
+            generation = self.meta.get("generation", 0)
+        return os.path.join(self.path, f"{name}.{generation}.bin")
+
+    def column(self, name):
+        """Read-only memory map of a whole column."""
+        if name not in self._maps:
+            dtype = np.dtype(self.meta["columns"][name])
+            if len(self) == 0:
+                return np.empty(0, dtype=dtype)
+            self._maps[name] = np.memmap(self._file(name), dtype=dtype,
+                                         mode="r", shape=(len(self),))
+        return self._maps[name]
+
+    def tour(self, tour, columns=None):
+        """Zero-copy column slices of one tour."""
+        t = self._by_tour[tour]
+        names = columns or list(self.meta["columns"])
+        return {name: self.column(name)[t["start"]:t["end"]]
+                for name in names}
+
+    def tours_on(self, date):
+        return [t["tour"] for t in self.tours if t["date"] == date]
+
+    def append(self, tour, frame, date):
+        """
+        Append the rows of one tour (a DataFrame with the store columns).
+        A stored tour is changed with sync(), which rewrites the columns.
+        """
+        if tour in self:
+            raise ValueError(f"{tour} is already in the store")
+        n = len(frame)
+        for name, dtype in self.meta["columns"].items():
+            with open(self._file(name), "ab") as f:
+                # drop the bytes of an interrupted earlier append
+                f.truncate(len(self) * np.dtype(dtype).itemsize)
+                f.write(_stored(frame, name, dtype).tobytes())
+
+        entry = {"tour": tour, "date": str(date), **_tour_fields(frame),
+                 "hash": tour_hash(frame, date, self.meta["columns"]),
+                 "start": len(self), "end": len(self) + n}
+        self.tours.append(entry)
+        self._by_tour[tour] = entry
+        self.meta["rows"] += n
+        _write_json(os.path.join(self.path, "meta.json"), self.meta)
+        self._maps = {}   # reopen with the new length
+
+    def sync(self, df):
+        """
+        Make the store hold exactly the tours of df (grouped by gpx_path,
+        with a date column). Unchanged tours are left alone, new ones
+        appended; changed or removed tours, or an outdated schema, make
+        the next generation. Returns (appended, replaced, removed).
+        """
+        groups = dict(tuple(df.groupby("gpx_path", sort=False,
+                                       observed=True)))
+        dates = {tour: rows["date"].iloc[0] for tour, rows in groups.items()}
+        hashes = {tour: tour_hash(rows, dates[tour], self.columns)
+                  for tour, rows in groups.items()}
+
+        stored = {t["tour"]: t["hash"] for t in self.tours} \
+            if self.schema_ok else {}
+        new = [t for t in groups if t not in stored]
+        changed = [t for t in groups if t in stored and stored[t] != hashes[t]]
+        removed = [t for t in stored if t not in groups]
+
+        if changed or removed or not self.schema_ok:
+            keep = [t for t in self.tours
+                    if t["tour"] in stored and t["tour"] not in changed
+                    and t["tour"] not in removed]
+            self._rewrite(keep, [(t, groups[t], dates[t])
+                                 for t in changed + new])
+        else:
+            for tour in new:
+                self.append(tour, groups[tour], dates[tour])
+        return len(new), len(changed), len(removed)
+
+    def _rewrite(self, keep, add):
+        """
+        Next generation of the columns: the kept tours' slices, then the
+        added (tour, frame, date) tours; switch meta.json over to it.
+        """
+        old_gen = self.meta.get("generation", 0)
+        gen = old_gen + 1
+        meta = self._empty_meta(gen)
+        old_columns = self.meta["columns"] if self.schema_ok else {}
+
+        for name, dtype in self.columns.items():
+            with open(self._file(name, gen), "wb") as f:
+                if name in old_columns:
+                    col = self.column(name)
+                    for t in keep:
+                        f.write(np.ascontiguousarray(
+                            col[t["start"]:t["end"]]).tobytes())
+                for _, frame, _ in add:
+                    f.write(_stored(frame, name, dtype).tobytes())
+
+        rows = 0
+        for t in keep:
+            n = t["end"] - t["start"]
+            meta["tours"].append({**t, "start": rows, "end": rows + n})
+            rows += n
+        for tour, frame, date in add:
+            meta["tours"].append({
+                "tour": tour, "date": str(date), **_tour_fields(frame),
+                "hash": tour_hash(frame, date, self.columns),
+                "start": rows, "end": rows + len(frame)})
+            rows += len(frame)
+        meta["rows"] = rows
+        _write_json(os.path.join(self.path, "meta.json"), meta)
+
+        # earlier generations (and pre-generation files) are not read any more
+        for path in glob.glob(os.path.join(self.path, "*.bin")):
+            if not path.endswith(f".{gen}.bin"):
+                os.remove(path)
+        self.meta = meta
+        self.tours = meta["tours"]
+        self._by_tour = {t["tour"]: t for t in self.tours}
+        self._maps = {}
+
+    def frame(self):
+        """
+        DataFrame over the whole store, with the columns of the clean CSV.
+        Numeric columns stay backed by the memory maps; gpx_path, date,
+        start_time, end_time and angle_bin are categoricals built from the
+        tour table and the bin codes.
+        """
+        data = {name: self.column(name) for name in self.meta["columns"]
+                if name != "time"}
+        data["time"] = pd.to_datetime(self.column("time"), utc=True)
+
+        sizes = [t["end"] - t["start"] for t in self.tours]
+        codes = np.repeat(np.arange(len(self.tours), dtype=np.int32), sizes)
+        data["gpx_path"] = pd.Categorical.from_codes(
+            codes, [t["tour"] for t in self.tours])
+        for field in ("date",) + TOUR_FIELDS:
+            values = [t.get(field) for t in self.tours]
+            cats = sorted({v for v in values if v is not None})
+            tour_codes = np.array([cats.index(v) if v is not None else -1
+                                   for v in values], dtype=np.int32)
+            data[field] = pd.Categorical.from_codes(tour_codes[codes], cats)
+        data["angle_bin"] = utb.as_categorical(
+            data[utb.code_column(utb.DEFAULT_WIDTH)])
+        return pd.DataFrame(data, copy=False)
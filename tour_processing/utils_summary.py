@@ -0,0 +1,197 @@
+import json
+import os
+import numpy as np  # type: ignore
+import pandas as pd
+import utils_bins as utb
+import utils_marks as utm
+
+ROSE_SECTORS = 16
+ROSE_SPEED_BANDS = [0, 5, 10, 15, 20]   # kts, last band is open-ended
+
+
+def wind_rose(wind_dir, wind_speed, sectors=ROSE_SECTORS,
+              bands=ROSE_SPEED_BANDS):
+    """
+    Histogram of (direction sector, speed band) point counts.
+    Sector 0 is centered on North. Returns a flat sector-major list of
+    sectors * bands ints (Firestore cannot store nested arrays).
+    """
+    width = 360 / sectors
+    sector = ((np.asarray(wind_dir) + width / 2) % 360 // width).astype(int)
+    band = np.searchsorted(bands, np.asarray(wind_speed), side="right") - 1
+    band = np.clip(band, 0, len(bands) - 1)
+    counts = np.bincount(sector * len(bands) + band,
+                         minlength=sectors * len(bands))
+    return counts.tolist()
+
+
+def polar_stats(df, width=utb.DEFAULT_WIDTH):
+    """
+    Per angle bin statistics of speed_ratio, boat_speed and wind_speed,
+    keyed by bin label. Counts and means are bincounts over the bin codes.
+    """
+    codes = df[utb.code_column(width)].values
+    count = utb.bin_counts(codes, width)
+    used = np.flatnonzero(count)
+    means = {col: utb.bin_counts(codes, width, df[col].values)[used]
+             / count[used]
+             for col in ("speed_ratio", "boat_speed", "wind_speed")}
+    grouped = df.groupby(utb.code_column(width))["speed_ratio"]
+    p90 = grouped.quantile(0.9).reindex(used).values
+    ratio_max = grouped.max().reindex(used).values
+
+    labels = utb.bin_labels(width)
+    return {labels[b]: {
+        "count": int(count[b]),
+        "ratio_mean": round(float(means["speed_ratio"][i]), 3),
+        "ratio_p90": round(float(p90[i]), 3),
+        "ratio_max": round(float(ratio_max[i]), 3),
+        "boat_speed_mean": round(float(means["boat_speed"][i]), 3),
+        "wind_speed_mean": round(float(means["wind_speed"][i]), 3),
+    } for i, b in enumerate(used)}
+
+
+def track_bounds(df):
+    return {
+        "lat_min": float(df["lat"].min()),
+        "lat_max": float(df["lat"].max()),
+        "lon_min": float(df["lon"].min()),
+        "lon_max": float(df["lon"].max()),
+        "start": str(df["time"].min()),
+        "end": str(df["time"].max()),
+        "points": int(len(df)),
+    }
+
+
+def summarize(df):
+    return {
+        "wind_rose": wind_rose(df["wind_dir"].values, df["wind_speed"].values),
+        "polar": polar_stats(df),
+        "bounds": track_bounds(df),
+    }
+
+
+def build_summaries(df):
+    """
+    Pre-aggregated summaries of the clean dataset, one per date.
+    Each holds the summary of the whole date and one per tour (gpx_path).
+    """
+    summaries = {}
+    for date, day in df.groupby("date"):
+        summaries[str(date)] = {
+            "date": str(date),
+            "rose_speed_bands": ROSE_SPEED_BANDS,
+            "summary": summarize(day),
+            "tours": {gpx: summarize(tour)
+                      for gpx, tour in day.groupby("gpx_path")},
+        }
+    return summaries
+
+
+def save_summaries(summaries, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    for date, summary in summaries.items():
+        with open(os.path.join(out_dir, f"{date}.json"), "w") as f:
+            json.dump(summary, f, separators=(",", ":"))
+
+
+# --- tour index: one row of headline statistics per tour ------------------
+
+TOUR_INDEX = "data/outputs/tour_index.csv"
+TOUR_INDEX_COLUMNS = [
+    "tour", "date", "start", "end", "duration_s", "distance_km", "points",
+    "boat_speed_mean", "boat_speed_max", "wind_speed_mean",
+    "speed_ratio_mean", "lat_min", "lat_max", "lon_min", "lon_max",
+    "hash",
+]
+
+
+def tour_row(tour, date, cols, content_hash=None):
+    """
+    Index row of one tour from its columns (lat, lon, time as ns or
+    datetime64, boat_speed, wind_speed, speed_ratio), in time order.
+    content_hash is the point store's hash of the tour's rows.
+    """
+    t = np.asarray(cols["time"]).astype("datetime64[ns]").astype(np.int64)
+    lat = np.asarray(cols["lat"], dtype=np.float64)
+    lon = np.asarray(cols["lon"], dtype=np.float64)
+    xy = utm.project(lat, lon, float(lat.mean()))
+    distance = float(np.hypot(*np.diff(xy, axis=0).T).sum())
+
+    def mean(name):
+        return round(float(np.nanmean(cols[name])), 3)
+
+    return {
+        "tour": tour,
+        "date": str(date),
+        "start": str(pd.Timestamp(int(t.min()), tz="UTC")),
+        "end": str(pd.Timestamp(int(t.max()), tz="UTC")),
+        "duration_s": int((t.max() - t.min()) // 1_000_000_000),
+        "distance_km": round(distance / 1000, 3),
+        "points": int(len(t)),
+        "boat_speed_mean": mean("boat_speed"),
+        "boat_speed_max": round(float(np.nanmax(cols["boat_speed"])), 3),
+        "wind_speed_mean": mean("wind_speed"),
+        "speed_ratio_mean": mean("speed_ratio"),
+        "lat_min": float(lat.min()), "lat_max": float(lat.max()),
+        "lon_min": float(lon.min()), "lon_max": float(lon.max()),
+        "hash": content_hash,
+    }
+
+
+def load_tour_index(path=TOUR_INDEX):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=TOUR_INDEX_COLUMNS)
+    return pd.read_csv(path, dtype={"hash": str})
+
+
+def update_tour_index(store, path=TOUR_INDEX):
+    """
+    Make the index hold one row per tour of the point store. Rows whose
+    store hash is unchanged are kept; new and changed tours are
+    summarized again, tours no longer stored are dropped.
+    Returns (index, tours summarized).
+    """
+    old = load_tour_index(path)
+    if "hash" in old.columns:
+        known = {(r["tour"], r["hash"]): r for r in old.to_dict("records")}
+    else:
+        known = {}                        # index without hashes: rebuild
+    rows, built = [], 0
+    for t in store.tours:
+        row = known.get((t["tour"], t["hash"]))
+        if row is None:
+            row = tour_row(t["tour"], t["date"], store.tour(t["tour"]),
+                           t["hash"])
+            built += 1
+        rows.append(row)
+    index = pd.DataFrame(rows, columns=TOUR_INDEX_COLUMNS)
+    if built or len(index) != len(old) or "hash" not in old.columns:
+        index.to_csv(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+    return index, built
+
+
+def filter_tours(index, date_from=None, date_to=None, ranges=None,
+                 sort="date", descending=False, limit=None):
+    """
+    Rows of the tour index with date_from <= date <= date_to (ISO
+    strings) and every {column: (min, max)} of ranges (None = open),
+    sorted by a column. Unknown columns raise KeyError.
+    """
+    keep = np.ones(len(index), dtype=bool)
+    if date_from is not None:
+        keep &= index["date"].values >= date_from
+    if date_to is not None:
+        keep &= index["date"].values <= date_to
+    for name, (lo, hi) in (ranges or {}).items():
+        values = index[name].values
+        if lo is not None:
+            keep &= values >= lo
+        if hi is not None:
+            keep &= values <= hi
+    if sort not in index.columns:
+        raise KeyError(sort)
+    rows = index[keep].sort_values([sort, "tour"], ascending=not descending,
+                                   kind="stable")
+    return rows if limit is None else rows.head(limit)
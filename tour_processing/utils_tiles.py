@@ -0,0 +1,196 @@
+"""
+Web-mercator heatmap tiles of speed_ratio and boat_speed.
+
+Every point is binned into the 256x256 pixel grid of the slippy-map tile
+it falls in, at each zoom of ZOOMS, with one np.bincount per layer. A
+tile stores per-pixel counts and sums (not means), so adding the points
+of new tours to a tile is an addition:
+
+    heatmap_tiles/
+        tours.json                 {"tours": {tour: content hash},
+                                    "pending": {...} during a merge}
+        <z>/<x>/<y>.npz            count, <layer>_count, <layer>_sum
+        <z>/<x>/<y>.<layer>.png    rendered tile, dropped on update
+
+Only the tiles touched by new tours are rewritten. The tours being merged
+are recorded as pending before any tile is touched; if a tour changed or
+left the store, or an earlier merge never completed, the sums cannot be
+trusted and all tiles are rebuilt from the store.
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import matplotlib.pyplot as plt   # type: ignore
+import numpy as np  # type: ignore
+
+TILE_SIZE = 256
+ZOOMS = range(12, 18)
+LAYERS = {"speed_ratio": (0.0, 0.6), "boat_speed": (0.0, 8.0)}   # color range
+
+
+def mercator_pixels(lat, lon, z):
+    """Global pixel coordinates of lat/lon at zoom z (float arrays)."""
+    scale = TILE_SIZE * 2 ** z
+    lat = np.radians(np.clip(lat, -85.05112878, 85.05112878))
+    x = (np.asarray(lon) + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * scale
+    return x, y
+
+
+def bin_points(lat, lon, values, z):
+    """
+    {(x, y): {"count": ..., "<layer>_count": ..., "<layer>_sum": ...}} of
+    the tiles the points fall in at zoom z. values is {layer: array}.
+    """
+    px, py = mercator_pixels(lat, lon, z)
+    px, py = px.astype(np.int64), py.astype(np.int64)
+    tx, ty = px // TILE_SIZE, py // TILE_SIZE
+    pixel = (py % TILE_SIZE) * TILE_SIZE + px % TILE_SIZE
+
+    tiles, tile_of = np.unique(np.column_stack([tx, ty]), axis=0,
+                               return_inverse=True)
+    tile_of = tile_of.ravel()
+    flat = tile_of * TILE_SIZE ** 2 + pixel
+    size = len(tiles) * TILE_SIZE ** 2
+    shape = (len(tiles), TILE_SIZE, TILE_SIZE)
+
+    arrays = {"count": np.bincount(flat, minlength=size).reshape(shape)}
+    for layer, v in values.items():
+        v = np.asarray(v, dtype=np.float64)
+        ok = ~np.isnan(v)
+        arrays[f"{layer}_count"] = np.bincount(
+            flat[ok], minlength=size).reshape(shape)
+        arrays[f"{layer}_sum"] = np.bincount(
+            flat[ok], weights=v[ok], minlength=size).reshape(shape)
+
+    return {(int(x), int(y)): {k: a[i] for k, a in arrays.items()}
+            for i, (x, y) in enumerate(tiles)}
+
+
+def tile_path(tile_dir, z, x, y, ext="npz"):
+    return os.path.join(tile_dir, str(z), str(x), f"{y}.{ext}")
+
+
+def load_tile(tile_dir, z, x, y):
+    path = tile_path(tile_dir, z, x, y)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def save_tile(tile_dir, z, x, y, arrays):
+    path = tile_path(tile_dir, z, x, y)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+    for layer in LAYERS:   # rendered PNGs are now stale
+        png = tile_path(tile_dir, z, x, y, f"{layer}.png")
+        if os.path.exists(png):
+            os.remove(png)
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return {"tours": {}}
+    with open(path) as f:
+        state = json.load(f)
+    if isinstance(state, list):             # tour list without hashes
+        return {"tours": {t: None for t in state}}
+    return state
+
+
+def _save_state(path, state):
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def update_tiles(tile_dir, store):
+    """
+    Add the points of the store's tours that are not binned yet to the
+    tiles they touch, or rebuild every tile when a binned tour changed.
+    Returns (tours binned, tiles written).
+    """
+    os.makedirs(tile_dir, exist_ok=True)
+    state_path = os.path.join(tile_dir, "tours.json")
+    state = _load_state(state_path)
+    current = {t["tour"]: t["hash"] for t in store.tours}
+    done = state["tours"]
+
+    if state.get("pending") or any(current.get(t) != h
+                                   for t, h in done.items()):
+        for z in ZOOMS:
+            shutil.rmtree(os.path.join(tile_dir, str(z)), ignore_errors=True)
+        done = {}
+    new = [t for t in store.tours if t["tour"] not in done]
+    if not new:
+        _save_state(state_path, {"tours": done})
+        return 0, 0
+    pending = {t["tour"]: t["hash"] for t in new}
+    _save_state(state_path, {"tours": done, "pending": pending})
+
+    # new tours are contiguous row ranges of the store columns
+    rows = np.concatenate([np.arange(t["start"], t["end"]) for t in new])
+    lat, lon = store.column("lat")[rows], store.column("lon")[rows]
+    values = {layer: store.column(layer)[rows] for layer in LAYERS}
+
+    written = 0
+    for z in ZOOMS:
+        for (x, y), arrays in bin_points(lat, lon, values, z).items():
+            old = load_tile(tile_dir, z, x, y)
+            if old is not None:
+                arrays = {k: old[k] + a for k, a in arrays.items()}
+            save_tile(tile_dir, z, x, y, arrays)
+            written += 1
+
+    _save_state(state_path, {"tours": {**done, **pending}})
+    return len(new), written
+
+
+def tile_means(arrays, layer):
+    """Per-pixel mean of a layer, NaN where there are no points."""
+    count = arrays[f"{layer}_count"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, arrays[f"{layer}_sum"] / count, np.nan)
+
+
+def tile_array(arrays):
+    """
+    Compact little-endian tile: uint32 count[256*256], then float32 mean
+    per layer (in LAYERS order, NaN where empty), row-major from the
+    top-left pixel.
+    """
+    parts = [arrays["count"].astype("<u4").tobytes()]
+    for layer in LAYERS:
+        parts.append(tile_means(arrays, layer).astype("<f4").tobytes())
+    return b"".join(parts)
+
+
+def render_png(tile_dir, layer, z, x, y):
+    """PNG of a layer's mean per pixel, cached next to the tile."""
+    png = tile_path(tile_dir, z, x, y, f"{layer}.png")
+    if os.path.exists(png):
+        with open(png, "rb") as f:
+            return f.read()
+    arrays = load_tile(tile_dir, z, x, y)
+    if arrays is None:
+        return None
+
+    vmin, vmax = LAYERS[layer]
+    means = tile_means(arrays, layer)
+    rgba = plt.cm.turbo(np.clip((means - vmin) / (vmax - vmin), 0, 1))
+    rgba[np.isnan(means), 3] = 0.0
+    buf = io.BytesIO()
+    plt.imsave(buf, rgba, format="png")
+
+    # unique temp name: several server threads may render the same tile
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(png), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buf.getvalue())
+    os.replace(tmp, png)
+    return buf.getvalue()
@@ -0,0 +1,129 @@
+"""
+Array-backed track.
+
+A Track holds contiguous columns instead of a list of (lat, lon, time)
+tuples: lat and lon (float64 degrees), epoch (int64 ns since epoch,
+UTC) and optional per-point channels (float64 arrays of the same length,
+e.g. boat_speed). Slicing, including by time window, returns views.
+
+For code written against the tuple form, a Track also behaves as a
+sequence of (lat, lon, datetime) tuples: len(), iteration, track[i] and
+track[a:b] work as on the list get_gpx_points used to return.
+"""
+
+from datetime import timezone
+import numpy as np  # type: ignore
+import pandas as pd
+
+
+class Track:
+
+    __slots__ = ("lat", "lon", "epoch", "channels")
+
+    def __init__(self, lat, lon, epoch, channels=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.epoch = np.asarray(epoch, dtype=np.int64)
+        self.channels = {k: np.asarray(v, dtype=np.float64)
+                         for k, v in (channels or {}).items()}
+
+    # --- adapters --------------------------------------------------------
+
+    @classmethod
+    def from_points(cls, points_with_time):
+        """From a list of (lat, lon, datetime) tuples."""
+        if isinstance(points_with_time, cls):
+            return points_with_time
+        n = len(points_with_time)
+        lat = np.fromiter((p[0] for p in points_with_time), np.float64, n)
+        lon = np.fromiter((p[1] for p in points_with_time), np.float64, n)
+        epoch = pd.to_datetime([p[2] for p in points_with_time], utc=True) \
+            .values.astype("datetime64[ns]").astype(np.int64)
+        return cls(lat, lon, epoch)
+
+    @classmethod
+    def from_records(cls, records, channels=()):
+        """From per-point dicts with lat, lon, time and the given channels."""
+        frame = pd.DataFrame.from_records(records)
+        epoch = pd.to_datetime(frame["time"], utc=True) \
+            .values.astype("datetime64[ns]").astype(np.int64)
+        return cls(frame["lat"].values, frame["lon"].values, epoch,
+                   {c: frame[c].values for c in channels})
+
+    def to_points(self):
+        """List of (lat, lon, datetime) tuples, datetimes in UTC."""
+        return list(self)
+
+    def times(self):
+        """Times as a UTC DatetimeIndex."""
+        return pd.to_datetime(self.epoch, utc=True)
+
+    def to_frame(self):
+        """DataFrame with time, lat, lon and the channels, in that order."""
+        data = {"time": self.times(), "lat": self.lat, "lon": self.lon}
+        data.update(self.channels)
+        return pd.DataFrame(data, copy=False)
+
+    def to_records(self):
+        """List of per-point dicts, the form of the legacy datasets."""
+        return self.to_frame().to_dict("records")
+
+    # --- sequence protocol -----------------------------------------------
+
+    def __len__(self):
+        return len(self.epoch)
+
+    def __iter__(self):
+        times = self.times().to_pydatetime()
+        for lat, lon, t in zip(self.lat.tolist(), self.lon.tolist(), times):
+            yield lat, lon, t.replace(tzinfo=timezone.utc)
+
+    def __getitem__(self, key):
+        """
+        track[i] -> (lat, lon, datetime); track["name"] -> column;
+        track[slice or index array] -> Track (views for slices).
+        """
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, (int, np.integer)):
+            t = pd.Timestamp(self.epoch[key], tz="UTC").to_pydatetime()
+            return float(self.lat[key]), float(self.lon[key]), t
+        return Track(self.lat[key], self.lon[key], self.epoch[key],
+                     {k: v[key] for k, v in self.channels.items()})
+
+    # --- columns ---------------------------------------------------------
+
+    def column(self, name):
+        if name in ("lat", "lon", "epoch"):
+            return getattr(self, name)
+        return self.channels[name]
+
+    def with_channels(self, **channels):
+        """Same points with channels added (arrays are shared, not copied)."""
+        merged = dict(self.channels)
+        merged.update(channels)
+        return Track(self.lat, self.lon, self.epoch, merged)
+
+    def seconds(self):
+        """Seconds since the first point (float64)."""
+        if len(self) == 0:
+            return np.empty(0)
+        return (self.epoch - self.epoch[0]) / 1e9
+
+    def window(self, start, end):
+        """Points with start <= time <= end, as a zero-copy view."""
+        lo = np.searchsorted(self.epoch, _to_ns(start), side="left")
+        hi = np.searchsorted(self.epoch, _to_ns(end), side="right")
+        return self[lo:hi]
+
+
+def _to_ns(t):
+    ts = pd.Timestamp(t)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
+def as_track(points):
+    """Track of a Track or of a list of (lat, lon, datetime) tuples."""
+    return Track.from_points(points)
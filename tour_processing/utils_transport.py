@@ -0,0 +1,121 @@
+"""
+Compact track encodings for /get_track.
+
+polyline: Google encoded-polyline string (1e-5 deg precision).
+binary:   little-endian buffer, readable zero-copy with typed arrays:
+
+    offset  type        field
+    0       char[4]     magic "WMWT"
+    4       uint8       version (1)
+    5       uint8       flags: 1 = time channel, 2 = speed channel
+    6       uint16      reserved
+    8       uint32      n points
+    12      uint32      coordinate scale (1e6 -> micro-degrees)
+    16      float64     t0, epoch seconds of the first point
+    24      int32[n]    lat, first value absolute, then deltas
+    ..      int32[n]    lon, same
+    ..      int32[n]    time in ms since the previous point (if flag 1)
+    ..      uint16[n]   boat_speed * 100 (if flag 2)
+
+The decoder takes Int32Array views on the buffer and prefix-sums them.
+"""
+
+import numpy as np  # type: ignore
+
+MAGIC = b"WMWT"
+VERSION = 1
+FLAG_TIME = 1
+FLAG_SPEED = 2
+COORD_SCALE = 1_000_000
+HEADER = np.dtype([("magic", "S4"), ("version", "u1"), ("flags", "u1"),
+                   ("reserved", "<u2"), ("n", "<u4"), ("scale", "<u4"),
+                   ("t0", "<f8")])
+
+
+def delta(values):
+    """First value absolute, then differences (int64 in, int64 out)."""
+    return np.diff(values, prepend=np.int64(0))
+
+
+def encode_polyline(lat, lon, precision=5):
+    """Google encoded polyline of the track, vectorized over all points."""
+    factor = 10 ** precision
+    q = np.round(np.column_stack([lat, lon]) * factor).astype(np.int64)
+    d = np.diff(q, axis=0, prepend=np.zeros((1, 2), np.int64)).ravel()
+    v = np.where(d < 0, ~(d << 1), d << 1)   # zigzag: sign into bit 0
+
+    shifts = 5 * np.arange(7)               # up to 35 bits
+    chunks = (v[:, None] >> shifts) & 0x1F
+    count = np.maximum(1, ((v[:, None] >> shifts) > 0).sum(axis=1))
+    more = np.arange(7) < (count - 1)[:, None]
+    chars = (chunks | np.where(more, 0x20, 0)) + 63
+    return chars[np.arange(7) < count[:, None]].astype(np.uint8) \
+        .tobytes().decode("ascii")
+
+
+def decode_polyline(encoded, precision=5):
+    """Reference decoder, the inverse of encode_polyline."""
+    values, shift, result = [], 0, 0
+    for c in encoded.encode("ascii"):
+        b = c - 63
+        result |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            shift, result = 0, 0
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2),
+                       axis=0)
+    return coords / 10 ** precision
+
+
+def encode_binary(lat, lon, times=None, speed=None):
+    """
+    Binary track buffer (see module docstring). times are datetime64
+    values, speed is boat_speed; both channels are optional.
+    """
+    n = len(lat)
+    flags = (FLAG_TIME if times is not None else 0) | \
+        (FLAG_SPEED if speed is not None else 0)
+
+    t0 = 0.0
+    parts = []
+    for values in (lat, lon):
+        q = np.round(np.asarray(values, dtype=np.float64) * COORD_SCALE)
+        parts.append(delta(q.astype(np.int64)).astype("<i4"))
+    if times is not None:
+        ms = np.asarray(times, dtype="datetime64[ms]").astype(np.int64)
+        t0 = ms[0] / 1000 if n else 0.0
+        dt = delta(ms)
+        if n:
+            dt[0] = 0
+        parts.append(dt.astype("<i4"))
+    if speed is not None:
+        cs = np.round(np.nan_to_num(np.asarray(speed, dtype=np.float64)) * 100)
+        parts.append(np.clip(cs, 0, 65535).astype("<u2"))
+
+    header = np.array([(MAGIC, VERSION, flags, 0, n, COORD_SCALE, t0)],
+                      dtype=HEADER)
+    return header.tobytes() + b"".join(p.tobytes() for p in parts)
+
+
+def decode_binary(buf):
+    """Reference decoder: dict of lat, lon and the optional channels."""
+    header = np.frombuffer(buf, dtype=HEADER, count=1)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError("not a WMWT track buffer")
+    n, flags = int(header["n"]), int(header["flags"])
+    offset = HEADER.itemsize
+
+    def take(dtype):
+        nonlocal offset
+        values = np.frombuffer(buf, dtype=dtype, count=n, offset=offset)
+        offset += values.nbytes
+        return values
+
+    out = {"lat": np.cumsum(take("<i4"), dtype=np.int64) / header["scale"],
+           "lon": np.cumsum(take("<i4"), dtype=np.int64) / header["scale"]}
+    if flags & FLAG_TIME:
+        out["time_s"] = header["t0"] + np.cumsum(take("<i4")) / 1000
+    if flags & FLAG_SPEED:
+        out["speed"] = take("<u2") / 100
+    return out
@@ -1,4 +1,5 @@
 import json
+import os
 import folium  # type: ignore
 import math
 from datetime import datetime
@@ -14,10 +15,26 @@ def winddir2coord(lat, lon, bearing, speed, scale=0.01):
             lon + scale * speed * math.cos(rad))
 
 
-def get_wind(wind_path, date, target_time):
+def load_wind_day(wind_path, date):
+    """
+    Wind document of a single date.
+
+    wind_path is either the per-date directory written by load_wind.py
+    (only <date>.json is read) or a legacy all-dates wind_data.json.
+    Returns {} when the date is unknown.
+    """
+    if os.path.isdir(wind_path):
+        day_path = os.path.join(wind_path, f"{date}.json")
+        if not os.path.exists(day_path):
+            return {}
+        with open(day_path) as f:
+            return json.load(f)
     with open(wind_path) as f:
-        data = json.load(f)
-    records = data[date]["records"]
+        return json.load(f).get(date, {})
+
+
+def get_wind(wind_path, date, target_time):
+    records = load_wind_day(wind_path, date)["records"]
     # Find the record for that time
     record = next((r for r in records if r["Time"] == target_time), None)
 
@@ -32,10 +49,7 @@ def get_wind(wind_path, date, target_time):
 
 
 def get_wind_range(wind_path, date, start_time, end_time):
-    with open(wind_path) as f:
-        data = json.load(f)
-
-    records = data.get(date, {}).get("records", [])
+    records = load_wind_day(wind_path, date).get("records", [])
     results = []
 
     for r in records:
@@ -53,9 +67,7 @@ def get_wind_range(wind_path, date, start_time, end_time):
 
 
 def load_wind_records(wind_path, date):
-    with open(wind_path) as f:
-        data = json.load(f)
-    records = data[date]["records"]
+    records = load_wind_day(wind_path, date)["records"]
 
     # Convert wind records to datetime + numeric values
     times, speeds, dirs_deg = [], [], []
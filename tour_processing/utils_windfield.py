@@ -0,0 +1,157 @@
+import json
+import os
+from datetime import datetime
+import numpy as np  # type: ignore
+import pandas as pd
+from scipy.spatial import cKDTree  # type: ignore
+
+EARTH_R = 6371000.0  # m
+
+
+class NoStationsError(ValueError):
+    """The wind CSV has no positioned station for the requested date."""
+
+
+def to_epoch(times):
+    """datetimes / datetime64 -> float seconds. Naive times are kept as-is,
+    aware ones are compared on their wall clock, like assign_wind_to_track."""
+    times = pd.to_datetime(pd.Series(times))
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)
+    return times.values.astype("datetime64[ns]").astype(np.int64) / 1e9
+
+
+class WindField:
+    """
+    Wind speed and direction measured at several stations.
+
+    All station series are resampled once onto the union of their time
+    stamps, and station positions go into a KD-tree. Evaluating the field
+    at a whole track is then a k-nearest query plus array gathers:
+    inverse-distance weighting in space, linear in time, directions
+    blended as unit vectors so 350° and 10° average to 0°.
+    """
+
+    def __init__(self, stations):
+        """
+        stations: list of dicts with name, lat, lon, times (datetimes),
+        speeds (kts) and dirs (deg, where the wind comes from).
+        """
+        if not stations:
+            raise ValueError("WindField needs at least one station")
+        self.names = [s["name"] for s in stations]
+        lat = np.array([s["lat"] for s in stations], dtype=np.float64)
+        lon = np.array([s["lon"] for s in stations], dtype=np.float64)
+        self.lat0 = float(lat.mean())
+        self.tree = cKDTree(self._project(lat, lon))
+
+        series = []
+        for s in stations:
+            t = to_epoch(s["times"])
+            if len(t) == 0:
+                raise ValueError(f"station {s['name']} has no records")
+            order = np.argsort(t)
+            series.append((t[order],
+                           np.asarray(s["speeds"], dtype=np.float64)[order],
+                           np.radians(np.asarray(s["dirs"],
+                                                 dtype=np.float64))[order]))
+        self.grid = np.unique(np.concatenate([t for t, _, _ in series]))
+
+        # (stations, grid) arrays; stations hold their first/last value
+        # outside of their own time range, like interpolate_wind
+        self.speed = np.vstack([np.interp(self.grid, t, sp)
+                                for t, sp, _ in series])
+        self.u = np.vstack([np.interp(self.grid, t, np.sin(d))
+                            for t, _, d in series])
+        self.v = np.vstack([np.interp(self.grid, t, np.cos(d))
+                            for t, _, d in series])
+
+    def _project(self, lat, lon):
+        """Local equirectangular projection in meters."""
+        x = np.radians(lon) * np.cos(np.radians(self.lat0)) * EARTH_R
+        y = np.radians(lat) * EARTH_R
+        return np.column_stack([x, y])
+
+    def at(self, lat, lon, times, k=3, power=2):
+        """
+        Interpolated (wind_speed, wind_dir) arrays for every track point.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        k = min(k, len(self.names))
+
+        dist, idx = self.tree.query(self._project(lat, lon), k=k)
+        dist = dist.reshape(len(lat), k)
+        idx = idx.reshape(len(lat), k)
+        w = 1.0 / np.maximum(dist, 1.0) ** power
+        w /= w.sum(axis=1, keepdims=True)
+
+        # time: position on the shared grid
+        t = np.clip(to_epoch(times), self.grid[0], self.grid[-1])
+        hi = np.clip(np.searchsorted(self.grid, t), 1, len(self.grid) - 1)
+        lo = hi - 1
+        if len(self.grid) == 1:
+            lo = hi = np.zeros(len(t), dtype=np.int64)
+            frac = np.zeros(len(t))
+        else:
+            frac = (t - self.grid[lo]) / (self.grid[hi] - self.grid[lo])
+        frac = frac[:, None]
+
+        def gather(values):
+            return (values[idx, lo[:, None]] * (1 - frac) +
+                    values[idx, hi[:, None]] * frac)
+
+        speed = (w * gather(self.speed)).sum(axis=1)
+        u = (w * gather(self.u)).sum(axis=1)
+        v = (w * gather(self.v)).sum(axis=1)
+        deg = np.degrees(np.arctan2(u, v)) % 360
+        return speed, deg
+
+    @classmethod
+    def from_wind_csv(cls, csv_path, stations_path, date=None):
+        """
+        Build the field from the CSV written by downloadWindData.js
+        (Date, Location, Time, Wind Direction, Wind Speed (kts)) and a
+        stations JSON {"wannsee": {"lat": .., "lon": ..}, ...}.
+        Locations without a known position are skipped.
+        """
+        with open(stations_path) as f:
+            positions = json.load(f)
+        df = pd.read_csv(csv_path)
+        if date is not None:
+            df = df[df["Date"] == date]
+
+        stations = []
+        for name, rows in df.groupby("Location"):
+            if name not in positions:
+                print(f"No position for wind station {name}, skipped")
+                continue
+            times = [datetime.strptime(f"{d} {t}", "%Y-%m-%d %H:%M")
+                     for d, t in zip(rows["Date"], rows["Time"])]
+            dirs = rows["Wind Direction"].astype(str).str.split("°").str[0]
+            stations.append({
+                "name": name,
+                "lat": positions[name]["lat"],
+                "lon": positions[name]["lon"],
+                "times": times,
+                "speeds": rows["Wind Speed (kts)"].astype(float).values,
+                "dirs": dirs.astype(float).values,
+            })
+        if not stations:
+            raise NoStationsError(f"no positioned station on {date}")
+        return cls(stations)
+
+
+def load_wind_field(csv_path, stations_path, date=None):
+    """
+    WindField of a date, or None when the files are missing or hold no
+    positioned station for that date; callers then fall back to the
+    single-station wind_data. Malformed files still raise.
+    """
+    if not (os.path.exists(csv_path) and os.path.exists(stations_path)):
+        return None
+    try:
+        return WindField.from_wind_csv(csv_path, stations_path, date)
+    except NoStationsError as e:
+        print(f"No wind field for {date} ({e}), using single-station wind")
+        return None
@@ -1,157 +1,176 @@
 """
-Visualize sailing tour for 2025-05-14
-This script creates a map visualization showing:
+Visualize the sailing tours of every date (or of the dates given).
+For each date, this script creates a map visualization showing:
 - Blue trajectory line
 - Green arrows = boat heading (from corrected computation)
 - Red arrows = wind direction
 - Yellow dots at measurement points
+
+The dataset is read once; the dates are rendered in worker processes.
 """
 
+import argparse
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+import utils_parallel as utpar
+import utils_plots as utpl
+import utils_store as utst
 
 # CONFIGURATION
 CSV_FILE = "data/outputs/all_sailing_performance.csv"
-TOUR_DATE = "2025-05-14"
-OUTPUT_FILE = "data/outputs/tour_2025-05-14_visualization.png"
+STORE_DIR = "data/outputs/point_store"
+OUTPUT_FILE = "data/outputs/tour_{date}_visualization.png"
 VECTOR_EVERY_N = 10  # Show arrows every N points
 ARROW_SCALE = 0.001  # Arrow length in degrees
+COLUMNS = ["lat", "lon", "time", "boat_heading", "wind_dir", "boat_speed",
+           "wind_speed", "speed_ratio"]
 
 
-def plot_tour():
-    """Visualize the sailing tour with trajectory and direction vectors"""
-    
-    # Load data
+def load_dataset():
+    """
+    Points of every date, with a string `date` column.
+    Read from the memory-mapped point store when it exists, from the CSV
+    otherwise.
+    """
+    if os.path.exists(os.path.join(STORE_DIR, "meta.json")):
+        print(f"Loading data from {STORE_DIR}...")
+        df = utst.PointStore(STORE_DIR).frame()
+        df = df[COLUMNS].assign(date=df["date"].astype(str))
+        return df
+
     print(f"Loading data from {CSV_FILE}...")
-    try:
-        df = pd.read_csv(CSV_FILE)
-    except FileNotFoundError:
-        print(f"\n❌ ERROR: File not found: {CSV_FILE}")
-        print("\nTo use this script:")
-        print("1. Make sure your CSV file is at: data/outputs/all_sailing_performance.csv")
-        print("2. Or upload it and update CSV_FILE variable in the script")
-        print("\nFor now, creating a demo visualization with sample data...\n")
-        create_demo()
-        return
-    
+    df = pd.read_csv(CSV_FILE, usecols=COLUMNS)
+
     # Convert time to datetime and extract date
-    df['time'] = pd.to_datetime(df['time'], format='mixed')
+    df['time'] = pd.to_datetime(df['time'], format='mixed', utc=True)
     df['date'] = df['time'].dt.date.astype(str)
-    
-    # Filter for specific tour date
-    tour_data = df[df['date'] == TOUR_DATE].copy()
-    
-    if len(tour_data) == 0:
-        print(f"❌ No data found for date: {TOUR_DATE}")
-        print(f"\nAvailable dates:")
-        for date in sorted(df['date'].unique()):
-            count = len(df[df['date'] == date])
-            print(f"  - {date} ({count} points)")
-        return
-    
-    print(f"✓ Found {len(tour_data)} points for {TOUR_DATE}")
-    
+    return df
+
+
+def arrows(ax, lons, lats, deg, color, label, zorder):
+    """One quiver call for all arrows of a layer (bearing: 0° = North)."""
+    rad = np.radians(deg)
+    ax.quiver(lons, lats, ARROW_SCALE * np.sin(rad), ARROW_SCALE * np.cos(rad),
+              angles='xy', scale_units='xy', scale=1, color=color,
+              width=0.0015, alpha=0.8, label=label, zorder=zorder)
+
+
+def plot_tour(tour_data, date, output_file):
+    """Visualize one date's tour with trajectory and direction vectors"""
+
     # Sort by time
     tour_data = tour_data.sort_values('time')
-    
+
     # Create figure
     fig, ax = plt.subplots(figsize=(16, 14))
-    
+
     # Plot trajectory as blue line
-    lons = tour_data['lon'].values
-    lats = tour_data['lat'].values
-    
+    lons = tour_data['lon'].to_numpy(dtype=np.float64)
+    lats = tour_data['lat'].to_numpy(dtype=np.float64)
+
     ax.plot(lons, lats, 'b-', linewidth=3, alpha=0.6, label='Trajectory', zorder=1)
-    
+
     # Add start and end markers
     ax.plot(lons[0], lats[0], 'go', markersize=15, label='Start', zorder=5)
     ax.plot(lons[-1], lats[-1], 'rs', markersize=15, label='End', zorder=5)
-    
-    # Add direction vectors every N points
-    vector_count = 0
-    for idx, row in tour_data.iterrows():
-        if tour_data.index.get_loc(idx) % VECTOR_EVERY_N != 0:
-            continue
-        
-        lon = row['lon']
-        lat = row['lat']
-        boat_heading = row['boat_heading']
-        wind_dir = row['wind_dir']
-        
-        # Skip if boat heading is invalid
-        if pd.isna(boat_heading) or boat_heading == 0:
-            continue
-        
-        # Convert angles to dx, dy for arrows
-        # Bearing: 0° = North, 90° = East, 180° = South, 270° = West
-        
-        # Boat heading arrow (GREEN)
-        boat_rad = np.radians(boat_heading)
-        dx_boat = ARROW_SCALE * np.sin(boat_rad)
-        dy_boat = ARROW_SCALE * np.cos(boat_rad)
-        
-        ax.annotate('', xy=(lon + dx_boat, lat + dy_boat), xytext=(lon, lat),
-           arrowprops=dict(arrowstyle='->', color='green', lw=1, alpha=0.8),
-           zorder=3)
-        if vector_count == 0:
-            ax.plot([], [], color='green', linewidth=2, label='Boat heading')
-        
-        # Wind direction arrow (RED)
-        if not pd.isna(wind_dir):
-            wind_rad = np.radians(wind_dir)
-            dx_wind = ARROW_SCALE * np.sin(wind_rad)
-            dy_wind = ARROW_SCALE * np.cos(wind_rad)
-            
-            ax.annotate('', xy=(lon + dx_wind, lat + dy_wind), xytext=(lon, lat),
-                arrowprops=dict(arrowstyle='->', color='red', lw=1, alpha=0.7),
-                zorder=2)
-            if vector_count == 0:
-                ax.plot([], [], color='red', linewidth=2, label='Wind direction')
-        
-        # Add small dot at vector point
-        ax.plot(lon, lat, 'yo', markersize=6, markeredgecolor='black', 
-                markeredgewidth=0.5, alpha=0.8, zorder=4)
-        
-        vector_count += 1
-    
+
+    # Direction vectors every N points, skipping invalid boat headings
+    boat = tour_data['boat_heading'].to_numpy(dtype=np.float64)[::VECTOR_EVERY_N]
+    wind = tour_data['wind_dir'].to_numpy(dtype=np.float64)[::VECTOR_EVERY_N]
+    v_lons, v_lats = lons[::VECTOR_EVERY_N], lats[::VECTOR_EVERY_N]
+    shown = ~np.isnan(boat) & (boat != 0)
+    with_wind = shown & ~np.isnan(wind)
+    vector_count = int(shown.sum())
+
+    if vector_count:
+        arrows(ax, v_lons[shown], v_lats[shown], boat[shown], 'green',
+               'Boat heading', 3)
+    if with_wind.any():
+        arrows(ax, v_lons[with_wind], v_lats[with_wind], wind[with_wind],
+               'red', 'Wind direction', 2)
+    ax.scatter(v_lons[shown], v_lats[shown], s=36, c='yellow',
+               edgecolors='black', linewidths=0.5, alpha=0.8, zorder=4)
+
+    # Statistics in one aggregation
+    stats = tour_data.agg({"time": ["min", "max"], "boat_speed": ["mean"],
+                           "wind_speed": ["mean"], "speed_ratio": ["mean"]})
+    start, end = stats.loc["min", "time"], stats.loc["max", "time"]
+
     # Labels and formatting
     ax.set_xlabel('Longitude', fontsize=12, fontweight='bold')
     ax.set_ylabel('Latitude', fontsize=12, fontweight='bold')
-    ax.set_title(f'Sailing Tour - {TOUR_DATE}\n'
-                 f'{tour_data.iloc[0]["time"].strftime("%H:%M")} - '
-                 f'{tour_data.iloc[-1]["time"].strftime("%H:%M")} '
+    ax.set_title(f'Sailing Tour - {date}\n'
+                 f'{start.strftime("%H:%M")} - {end.strftime("%H:%M")} '
                  f'({len(tour_data)} points, {vector_count} vectors shown)',
                  fontsize=16, fontweight='bold', pad=20)
-    
+
     ax.legend(loc='upper right', fontsize=11, framealpha=0.9)
     ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
     ax.set_aspect('equal', adjustable='box')
-    
+
     # Add statistics box
     stats_text = f'''Tour Statistics:
-Duration: {(tour_data.iloc[-1]["time"] - tour_data.iloc[0]["time"]).total_seconds()/3600:.1f} hours
-Avg Boat Speed: {tour_data["boat_speed"].mean():.1f} kts
-Avg Wind Speed: {tour_data["wind_speed"].mean():.1f} kts
-Avg Speed Ratio: {tour_data["speed_ratio"].mean():.2f}
+Duration: {(end - start).total_seconds()/3600:.1f} hours
+Avg Boat Speed: {stats.loc["mean", "boat_speed"]:.1f} kts
+Avg Wind Speed: {stats.loc["mean", "wind_speed"]:.1f} kts
+Avg Speed Ratio: {stats.loc["mean", "speed_ratio"]:.2f}
 Points: {len(tour_data)}
 Vectors Shown: {vector_count}'''
-    
+
     ax.text(0.02, 0.98, stats_text,
             transform=ax.transAxes,
             fontsize=10,
             verticalalignment='top',
             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.9,
                      edgecolor='black', linewidth=1))
-    
+
     plt.tight_layout()
-    plt.savefig(OUTPUT_FILE, dpi=150, bbox_inches='tight')
-    print(f"\n✓ Visualization saved to: {OUTPUT_FILE}")
-    print(f"  Duration: {tour_data.iloc[0]['time'].strftime('%H:%M')} - "
-          f"{tour_data.iloc[-1]['time'].strftime('%H:%M')}")
-    print(f"  Points: {len(tour_data)}, Vectors shown: {vector_count}")
-    
-    plt.close()
+    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return (f"✓ {date}: {output_file} ({start.strftime('%H:%M')} - "
+            f"{end.strftime('%H:%M')}, {len(tour_data)} points, "
+            f"{vector_count} vectors)")
+
+
+def _plot_date(args):
+    """Worker: render one date."""
+    date, tour_data = args
+    return plot_tour(tour_data, date, OUTPUT_FILE.format(date=date))
+
+
+def plot_tours(dates=None, workers=None):
+    """Render the given dates (all dates by default) in parallel."""
+
+    # Load data
+    try:
+        df = load_dataset()
+    except FileNotFoundError:
+        print(f"\n❌ ERROR: File not found: {CSV_FILE}")
+        print("\nTo use this script:")
+        print("1. Make sure your CSV file is at: data/outputs/all_sailing_performance.csv")
+        print("2. Or upload it and update CSV_FILE variable in the script")
+        print("\nFor now, creating a demo visualization with sample data...\n")
+        create_demo()
+        return
+
+    by_date = dict(tuple(df.groupby('date', observed=True, sort=True)))
+    missing = [d for d in dates or [] if d not in by_date]
+    for date in missing:
+        print(f"❌ No data found for date: {date}")
+    if missing:
+        print(f"\nAvailable dates:")
+        for date, tour_data in by_date.items():
+            print(f"  - {date} ({len(tour_data)} points)")
+
+    todo = [(d, by_date[d]) for d in (dates or by_date) if d in by_date]
+    if not todo:
+        return
+    print(f"Rendering {len(todo)} date(s)...")
+    with utpar.process_pool(workers, initializer=utpl.use_agg) as pool:
+        for line in pool.map(_plot_date, todo):
+            print(line)
 
 
 def create_demo():
@@ -235,8 +254,9 @@ Yellow dots = Measurement points'''
                      edgecolor='red', linewidth=2))
     
     plt.tight_layout()
-    plt.savefig(OUTPUT_FILE, dpi=150, bbox_inches='tight')
-    print(f"✓ DEMO visualization saved to: {OUTPUT_FILE}")
+    output_file = OUTPUT_FILE.format(date="demo")
+    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    print(f"✓ DEMO visualization saved to: {output_file}")
     print("  This shows what your real data will look like!")
     print("\nTo use with your data:")
     print("  1. Upload all_sailing_performance.csv to data/outputs/")
@@ -246,4 +266,9 @@ Yellow dots = Measurement points'''
 
 
 if __name__ == "__main__":
-    plot_tour()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Render tour maps.")
+    parser.add_argument("dates", nargs="*",
+                        help="dates to render (YYYY-MM-DD), all by default")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    plot_tours(args.dates, args.workers)
\ No newline at end of file